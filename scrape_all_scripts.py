@@ -1,13 +1,20 @@
 import argparse
 import os
 import re
+import sqlite3
+import tarfile
+import threading
 import time
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 OWNER = "ServiceNowDevProgram"
 REPO = "code-snippets"
@@ -15,6 +22,7 @@ BRANCH = "main"
 
 API_BASE = "https://api.github.com"
 RAW_BASE = "https://raw.githubusercontent.com"
+TARBALL_URL = "https://codeload.github.com/{owner}/{repo}/tar.gz/{branch}"
 
 BASE_FOLDERS = [
     "Client-Side Components",
@@ -111,25 +119,6 @@ EXTRA_FIELDS = [
 
 ALL_FIELDS = PRIMARY_FIELDS + EXTRA_FIELDS
 
-LIST_FIELDS = {
-    "client_script",
-    "client_script_v2",
-    "script_include",
-    "code",
-    "code2",
-    "server_script",
-    "html",
-    "css",
-    "scss",
-    "option_schema",
-    "link",
-    "demo_data",
-    "field_list",
-    "data_table",
-    "notes",
-    "onClick",
-}
-
 TEXT_EXTENSIONS = {
     ".css",
     ".scss",
@@ -143,6 +132,15 @@ TEXT_EXTENSIONS = {
 }
 
 S = requests.Session()
+# Keep-alive pool sized for thousands of raw blob fetches; connection-level
+# retries live in the adapter while req() keeps handling rate-limit statuses.
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, allowed_methods=("GET",)),
+)
+S.mount("https://", _ADAPTER)
+S.headers["Accept-Encoding"] = "gzip"
 load_dotenv()
 TOKEN = os.getenv("GITHUB_TOKEN")
 if TOKEN:
@@ -175,9 +173,113 @@ def list_tree_recursive(sha: str) -> List[Dict]:
     return resp.json().get("tree", [])
 
 
-def fetch_raw(path: str) -> str:
+# Blob texts keyed by repo path; filled by prefetch_raw so the per-snippet
+# loops become dict lookups instead of serial round-trips.
+_RAW_CACHE: Dict[str, str] = {}
+
+FETCH_WORKERS = 16
+
+# Anything larger than this is not a code snippet we want in a cell.
+MAX_TEXT_BYTES = 2_000_000
+
+# On-disk ETag cache so a rerun revalidates blobs with If-None-Match and
+# GitHub answers 304 for anything unchanged instead of resending bodies.
+_ETAG_DB = os.path.join(os.path.expanduser("~"), ".cache", "chatwebscraper.db")
+_ETAG_CONN: Optional[sqlite3.Connection] = None
+_ETAG_LOCK = threading.Lock()
+
+
+def _etag_cache() -> sqlite3.Connection:
+    global _ETAG_CONN
+    if _ETAG_CONN is None:
+        os.makedirs(os.path.dirname(_ETAG_DB), exist_ok=True)
+        conn = sqlite3.connect(_ETAG_DB, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS raw_cache (url TEXT PRIMARY KEY, etag TEXT, body TEXT)"
+        )
+        _ETAG_CONN = conn
+    return _ETAG_CONN
+
+
+@lru_cache(maxsize=4096)
+def _fetch_raw_http(path: str) -> str:
     url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
+    with _ETAG_LOCK:
+        cached = _etag_cache().execute(
+            "SELECT etag, body FROM raw_cache WHERE url = ?", (url,)
+        ).fetchone()
+    headers = {"If-None-Match": cached[0]} if cached else None
+    resp = req("GET", url, headers=headers, stream=True)
+    if resp.status_code == 304 and cached:
+        resp.close()
+        return cached[1]
+    if int(resp.headers.get("Content-Length") or 0) > MAX_TEXT_BYTES:
+        resp.close()
+        return ""
+    # Decode ourselves; .text would run charset detection on every blob.
+    text = resp.content.decode("utf-8", errors="replace")
+    etag = resp.headers.get("ETag")
+    if etag:
+        with _ETAG_LOCK:
+            conn = _etag_cache()
+            conn.execute(
+                "INSERT OR REPLACE INTO raw_cache (url, etag, body) VALUES (?, ?, ?)",
+                (url, etag, text),
+            )
+            conn.commit()
+    return text
+
+
+def fetch_raw(path: str) -> str:
+    cached = _RAW_CACHE.get(path)
+    if cached is not None:
+        return cached
+    text = _fetch_raw_http(path)
+    _RAW_CACHE[path] = text
+    return text
+
+
+def prefetch_raw(paths: Iterable[str]) -> None:
+    pending = [p for p in dict.fromkeys(paths) if p and p not in _RAW_CACHE]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        list(pool.map(fetch_raw, pending))
+
+
+def load_tarball() -> Optional[List[Dict]]:
+    """Download the whole branch as one tarball and fill the blob cache.
+
+    Returns blob entries shaped like the Git Trees API response so the
+    grouping helpers keep working, or None when the download fails (the
+    caller then falls back to the tree API plus per-file fetches).
+    """
+    url = TARBALL_URL.format(owner=OWNER, repo=REPO, branch=BRANCH)
+    try:
+        resp = req("GET", url, stream=True)
+    except requests.RequestException:
+        return None
+    tree: List[Dict] = []
+    try:
+        with tarfile.open(fileobj=resp.raw, mode="r|gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                # Strip the leading "<repo>-<branch>/" component.
+                path = member.name.partition("/")[2]
+                if not path:
+                    continue
+                tree.append({"type": "blob", "path": path})
+                _, ext = os.path.splitext(path.lower())
+                if ext in TEXT_EXTENSIONS:
+                    handle = tar.extractfile(member)
+                    if handle is not None:
+                        _RAW_CACHE[path] = handle.read().decode(
+                            "utf-8", errors="replace"
+                        )
+    except (tarfile.TarError, OSError):
+        return None
+    return tree
 
 
 def normalize_bool(value: str) -> str:
@@ -189,43 +291,57 @@ def normalize_bool(value: str) -> str:
     return value.strip()
 
 
-def first_match(text: str, patterns: Iterable[str]) -> str:
+def first_match(text: str, patterns: Iterable[re.Pattern]) -> str:
     for pat in patterns:
-        match = re.search(pat, text, flags=re.IGNORECASE)
+        match = pat.search(text)
         if match:
             return match.group(1).strip()
     return ""
 
 
-def parse_description(md: str) -> str:
-    desc = first_match(md, [r"(?i)\bdescription\s*[:\-]\s*(.+)"])
+DESCRIPTION_RE = re.compile(r"(?i)\bdescription\s*[:\-]\s*(.+)")
+META_LINE_RE = re.compile(
+    r"(?i)^(name|table|applies|type|event|ui|scope|field|condition|when|action|onclick|source\s*table|target\s*table|coalesce|client\s*callable)\s*[:\-]"
+)
+
+
+def parse_description(md: str, md_lines: Optional[List[str]] = None) -> str:
+    desc = first_match(md, [DESCRIPTION_RE])
     if desc:
         return desc
-    for line in md.splitlines():
+    for line in md_lines if md_lines is not None else md.splitlines():
         stripped = line.strip()
         if not stripped or stripped.startswith("#"):
             continue
-        if re.match(
-            r"(?i)^(name|table|applies|type|event|ui|scope|field|condition|when|action|onclick|source\s*table|target\s*table|coalesce|client\s*callable)\s*[:\-]",
-            stripped,
-        ):
+        if META_LINE_RE.match(stripped):
             continue
         return stripped
     return ""
 
 
+EVENT_TOKENS = ["onChange", "onLoad", "onSubmit", "onCellEdit", "onValueChange"]
+EVENT_CANONICAL = {token.lower(): token for token in EVENT_TOKENS}
+EVENT_UNION_RE = re.compile(
+    r"\b(" + "|".join(map(re.escape, EVENT_TOKENS)) + r")\b", re.IGNORECASE
+)
+TYPE_EVENT_RE = re.compile(r"(?i)\b(type|event)\s*[:\-]\s*([A-Za-z_]+)")
+
+
 def parse_event(md: str) -> str:
-    for token in ["onChange", "onLoad", "onSubmit", "onCellEdit", "onValueChange"]:
-        if re.search(rf"\b{re.escape(token)}\b", md, flags=re.IGNORECASE):
-            return token
-    match = re.search(r"(?i)\b(type|event)\s*[:\-]\s*([A-Za-z_]+)", md)
+    match = EVENT_UNION_RE.search(md)
+    if match:
+        return EVENT_CANONICAL[match.group(1).lower()]
+    match = TYPE_EVENT_RE.search(md)
     return match.group(2) if match else ""
 
 
 TABLE_PATTERNS = [
-    r"(?i)\btable\s*[:\-]\s*([A-Za-z0-9_\. ]+)",
-    r"(?i)\bapplies\s*to\s*[:\-]\s*([A-Za-z0-9_\. ]+)",
-    r"(?i)\bon\s+table\s*[:\-]\s*([A-Za-z0-9_\. ]+)",
+    re.compile(p)
+    for p in (
+        r"(?i)\btable\s*[:\-]\s*([A-Za-z0-9_\. ]+)",
+        r"(?i)\bapplies\s*to\s*[:\-]\s*([A-Za-z0-9_\. ]+)",
+        r"(?i)\bon\s+table\s*[:\-]\s*([A-Za-z0-9_\. ]+)",
+    )
 ]
 
 
@@ -249,242 +365,324 @@ GF_METHODS = [
 ]
 
 
+GF_UNION = re.compile(
+    r"\bg_form\.(?:"
+    + "|".join(map(re.escape, GF_METHODS))
+    + r")\(\s*['\"]([A-Za-z0-9_\.]+)['\"]"
+)
+
+
 def parse_fields_from_code(js: str) -> List[str]:
-    tokens: List[str] = []
-    for method in GF_METHODS:
-        pattern = rf"\bg_form\.{method}\(\s*['\"]([A-Za-z0-9_\.]+)['\"]"
-        tokens.extend(re.findall(pattern, js))
+    """Return the (up to) three most-referenced g_form field names."""
+    tokens = GF_UNION.findall(js)
     if not tokens:
         return []
-    freq = Counter(tokens)
-    ordered = sorted(freq.items(), key=lambda item: (-item[1], item[0]))
-    return [name for name, _count in ordered]
+    return [name for name, _count in Counter(tokens).most_common(3)]
 
 
 TABLE_CODE_PATTERNS = [
-    r"(?i)current\s*=\s*new\s+GlideRecord\(['\"]([A-Za-z0-9_\.]+)['\"]\)",
-    r"(?i)\bGlideRecord\(['\"]([A-Za-z0-9_\.]+)['\"]\)",
-    r"(?i)\btableName\s*=\s*['\"]([A-Za-z0-9_\.]+)['\"]",
+    re.compile(p)
+    for p in (
+        r"(?i)current\s*=\s*new\s+GlideRecord\(['\"]([A-Za-z0-9_\.]+)['\"]\)",
+        r"(?i)\bGlideRecord\(['\"]([A-Za-z0-9_\.]+)['\"]\)",
+        r"(?i)\btableName\s*=\s*['\"]([A-Za-z0-9_\.]+)['\"]",
+    )
 ]
 
 
 def parse_table_from_code(js: str) -> str:
     for pat in TABLE_CODE_PATTERNS:
-        match = re.search(pat, js)
+        match = pat.search(js)
         if match:
             return match.group(1)
     return ""
 
 
-README_PATTERNS: Dict[str, List[str]] = {
-    "name": [r"(?i)\bname\s*[:\-]\s*([^\n]+)"],
-    "client_side_type": [
-        r"(?i)\b(onChange|onLoad|onSubmit|onCellEdit|onValueChange)\b",
-    ],
-    "applies_to": [r"(?i)\bapplies\s*to\s*[:\-]\s*([^\n]+)"],
-    "condition": [r"(?i)\bcondition\s*[:\-]\s*([^\n]+)"],
-    "when_to_run": [
-        r"(?i)\bwhen\s*(?:to\s*run)?\s*[:\-]\s*([^\n]+)",
-        r"(?i)\bwhen\b\s*[:\-]\s*([^\n]+)",
-    ],
-    "action_name": [r"(?i)\baction\s*name\s*[:\-]\s*([^\n]+)"],
-    "onClick": [r"(?i)\bon\s*click\s*[:\-]\s*([^\n]+)", r"(?i)\bonclick\s*[:\-]\s*([^\n]+)"],
-    "coalesce": [r"(?i)\bcoalesce\s*[:\-]\s*([^\n]+)"],
-    "source_table": [r"(?i)\bsource\s*table\s*[:\-]\s*([^\n]+)"],
-    "target_table": [r"(?i)\btarget\s*table\s*[:\-]\s*([^\n]+)"],
-    "client_callable": [
-        r"(?i)\b(client\s*callable|glide\s*ajax\s*enabled)\s*[:\-]\s*([^\n]+)"
-    ],
-    "api_name": [r"(?i)\bapi\s*name\s*[:\-]\s*([^\n]+)"],
-    "access": [r"(?i)\baccessible\s*from\s*[:\-]\s*([^\n]+)"],
-    "mobile_callable": [r"(?i)\bmobile\s*callable\s*[:\-]\s*([^\n]+)"],
-    "sandbox_callable": [r"(?i)\bsandbox\s*enabled\s*[:\-]\s*([^\n]+)"],
-    "ui_type": [r"(?i)\bui\s*type\s*[:\-]\s*([^\n]+)"],
-    "sys_scope": [r"(?i)\bsys\s*scope\s*[:\-]\s*([^\n]+)", r"(?i)\bapplication\s*[:\-]\s*([^\n]+)"],
-    "catalog_item": [r"(?i)\bcat(?:alog)?\s*item\s*[:\-]\s*([^\n]+)"],
-    "data_table": [r"(?i)\bdata\s*table\s*[:\-]\s*([^\n]+)"],
-    "field_list": [r"(?i)\bfields?\s*[:\-]\s*([^\n]+)"],
-    "link": [r"(?i)\blink\s*[:\-]\s*(https?://[^\s]+)"],
-    "run_as": [r"(?i)\brun\s*as\s*[:\-]\s*([^\n]+)"],
-    "run_start": [r"(?i)\brun\s*start\s*[:\-]\s*([^\n]+)", r"(?i)\bstart\s*[:\-]\s*([^\n]+)"],
-    "run_period": [r"(?i)\brun\s*period\s*[:\-]\s*([^\n]+)"],
-    "run_dayofweek": [
-        r"(?i)\bday\s*of\s*week\s*[:\-]\s*([^\n]+)",
-        r"(?i)\bdayofweek\s*[:\-]\s*([^\n]+)",
-    ],
-    "run_dayofmonth": [
-        r"(?i)\bday\s*of\s*month\s*[:\-]\s*([^\n]+)",
-        r"(?i)\bdayofmonth\s*[:\-]\s*([^\n]+)",
-    ],
-    "run_time": [r"(?i)\btime\s*[:\-]\s*([^\n]+)"],
+# These READMEs are mostly "Key: value" lines, so one MULTILINE scan plus a
+# key-normalisation lookup replaces ~25 independent full-text searches.
+_KV_RE = re.compile(r"^[>\s*#_-]*([A-Za-z][A-Za-z _]+?)[\s*_]*[:\-]\s*(.+)$", re.MULTILINE)
+
+_KV_FIELDS: Dict[str, str] = {
+    "name": "name",
+    "applies to": "applies_to",
+    "condition": "condition",
+    "when": "when_to_run",
+    "when to run": "when_to_run",
+    "action name": "action_name",
+    "on click": "onClick",
+    "onclick": "onClick",
+    "coalesce": "coalesce",
+    "source table": "source_table",
+    "target table": "target_table",
+    "client callable": "client_callable",
+    "glide ajax enabled": "client_callable",
+    "api name": "api_name",
+    "accessible from": "access",
+    "mobile callable": "mobile_callable",
+    "sandbox enabled": "sandbox_callable",
+    "ui type": "ui_type",
+    "sys scope": "sys_scope",
+    "application": "sys_scope",
+    "cat item": "catalog_item",
+    "catalog item": "catalog_item",
+    "data table": "data_table",
+    "field": "field_list",
+    "fields": "field_list",
+    "link": "link",
+    "run as": "run_as",
+    "run start": "run_start",
+    "start": "run_start",
+    "run period": "run_period",
+    "day of week": "run_dayofweek",
+    "dayofweek": "run_dayofweek",
+    "day of month": "run_dayofmonth",
+    "dayofmonth": "run_dayofmonth",
+    "time": "run_time",
 }
 
+# Inline links aren't key:value lines; keep a targeted fallback for them.
+LINK_URL_RE = re.compile(r"(?i)\blink\s*[:\-]\s*(https?://[^\s]+)")
+
 BOOL_KEYS = {"client_callable", "mobile_callable", "sandbox_callable", "coalesce"}
 
 
-def parse_readme_metadata(md: str) -> Dict[str, str]:
+def parse_readme_metadata(
+    md: str, md_lines: Optional[List[str]] = None
+) -> Dict[str, str]:
     if not md:
         return {}
     data: Dict[str, str] = {}
-    for key, patterns in README_PATTERNS.items():
-        value = first_match(md, patterns)
-        if value:
-            data[key] = value
-    if "client_callable" in data:
-        data["client_callable"] = normalize_bool(data["client_callable"])
-    for key in ("mobile_callable", "sandbox_callable", "coalesce"):
+    for match in _KV_RE.finditer(md):
+        key = " ".join(match.group(1).lower().split())
+        field = _KV_FIELDS.get(key)
+        if field is None or field in data:
+            continue
+        value = match.group(2).strip()
+        if not value:
+            continue
+        if field == "link" and not value.lower().startswith(("http://", "https://")):
+            continue
+        data[field] = value
+    if "link" not in data:
+        link = LINK_URL_RE.search(md)
+        if link:
+            data["link"] = link.group(1)
+    for key in BOOL_KEYS:
         if key in data:
             data[key] = normalize_bool(data[key])
-    if "client_side_type" not in data:
-        event = parse_event(md)
-        if event:
-            data["client_side_type"] = event
+    event = parse_event(md)
+    if event:
+        data["client_side_type"] = event
     table = parse_table_from_readme(md)
     if table and "table" not in data:
         data["table"] = table
-    desc = parse_description(md)
+    desc = parse_description(md, md_lines)
     if desc:
         data["description"] = desc
     return data
 
 
+CODE_BLOCK_RE = re.compile(
+    r"```(?:javascript|js|json|xml|html|css)\s*\n(.*?)\n```", re.DOTALL
+)
+CONTROLLER_AS_RE = re.compile(r"controllerAs\s*:\s*['\"]([A-Za-z_][A-Za-z0-9_]*)['\"]")
+VAR_THIS_RE = re.compile(r"\bvar\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*this\s*;")
+LINK_FUNC_RE = re.compile(r"\bfunction\s+link\s*\(([^\)]*)\)\s*\{")
+
+
 def extract_code_blocks(md: str) -> List[str]:
-    pattern = r"```(?:javascript|js|json|xml|html|css)\s*\n(.*?)\n```"
-    return [block.strip() for block in re.findall(pattern, md, flags=re.DOTALL)]
+    return [block.strip() for block in CODE_BLOCK_RE.findall(md)]
 
 
 def extract_controller_as(client_js: str) -> str:
-    match = re.search(r"controllerAs\s*:\s*['\"]([A-Za-z_][A-Za-z0-9_]*)['\"]", client_js)
+    match = CONTROLLER_AS_RE.search(client_js)
     if match:
         return match.group(1)
-    match = re.search(r"\bvar\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*this\s*;", client_js)
+    match = VAR_THIS_RE.search(client_js)
     return match.group(1) if match else ""
 
 
 def extract_link_function(client_js: str) -> str:
-    match = re.search(r"\bfunction\s+link\s*\(([^\)]*)\)\s*\{", client_js)
+    match = LINK_FUNC_RE.search(client_js)
     if not match:
         return ""
     start = match.end()
     depth = 1
     idx = start
-    while idx < len(client_js):
-        char = client_js[idx]
-        if char == "{":
+    # Jump brace to brace with str.find instead of walking every character.
+    while depth:
+        open_at = client_js.find("{", idx)
+        close_at = client_js.find("}", idx)
+        if close_at == -1:
+            return ""
+        if open_at != -1 and open_at < close_at:
             depth += 1
-        elif char == "}":
+            idx = open_at + 1
+        else:
             depth -= 1
-            if depth == 0:
-                body = client_js[start:idx]
-                return f"function link({match.group(1)}){{\n{body}\n}}"
-        idx += 1
-    return ""
+            idx = close_at + 1
+    body = client_js[start : idx - 1]
+    return f"function link({match.group(1)}){{\n{body}\n}}"
 
 
 INCLUDE_NAME_HINTS = ("include", "processor", "server", "script_include", "ajax")
 CLIENT_NAME_HINTS = ("client", "workspace", "portal")
 
 
-def readme_mentions(filename: str, lines: List[str], token: str) -> bool:
-    norm = re.sub(r"[^A-Za-z0-9]+", "", token.lower())
+_NON_ALNUM_RE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def normalize_readme_lines(lines: List[str]) -> List[Tuple[str, str]]:
+    """Pair each line with (lowercased, alnum-only) forms, computed once."""
+    normalized: List[Tuple[str, str]] = []
     for line in lines:
         low = line.lower()
-        if token.lower() in low and norm in re.sub(r"[^A-Za-z0-9]+", "", low):
+        normalized.append((low, _NON_ALNUM_RE.sub("", low)))
+    return normalized
+
+
+def readme_mentions(norm_lines: List[Tuple[str, str]], token: str) -> bool:
+    needle = token.lower()
+    norm = _NON_ALNUM_RE.sub("", needle)
+    for low, flat in norm_lines:
+        if needle in low and norm in flat:
             return True
     return False
 
 
-def infer_js_role(filename: str, code: str, readme_lines: List[str]) -> str:
-    name = filename.lower()
-    content = code.lower()
-    if readme_mentions(filename, readme_lines, "script include"):
+# All content triggers fused into one alternation so classification walks
+# the file once instead of running one substring scan per needle.
+_CLIENT_FUNC_TRIGGERS = frozenset(
+    {
+        "function onload",
+        "function onchange",
+        "function onsubmit",
+        "function oncelledit",
+        "function onvaluechange",
+    }
+)
+_GLOBAL_TRIGGERS = frozenset({"g_form", "g_scratchpad"})
+_INCLUDE_TRIGGERS = frozenset({"class.create", "prototype =", "gs.", "gliderecord"})
+_CONTENT_TRIGGER_RE = re.compile(
+    "|".join(
+        map(
+            re.escape,
+            sorted(_CLIENT_FUNC_TRIGGERS | _GLOBAL_TRIGGERS | _INCLUDE_TRIGGERS),
+        )
+    )
+)
+
+
+def infer_js_role(
+    name: str, content: str, norm_lines: List[Tuple[str, str]]
+) -> str:
+    """Classify a JS file from its already-lowercased name and content."""
+    if readme_mentions(norm_lines, "script include"):
         return "script_include"
-    if readme_mentions(filename, readme_lines, "client script"):
+    if readme_mentions(norm_lines, "client script"):
         return "client"
+    hits = set(_CONTENT_TRIGGER_RE.findall(content))
     if any(hint in name for hint in INCLUDE_NAME_HINTS):
-        if "g_form" not in content:
+        if "g_form" not in hits:
             return "script_include"
     if any(hint in name for hint in CLIENT_NAME_HINTS):
         return "client"
-    if any(
-        trigger in content
-        for trigger in (
-            "function onload",
-            "function onchange",
-            "function onsubmit",
-            "function oncelledit",
-            "function onvaluechange",
-        )
-    ):
+    if hits & _CLIENT_FUNC_TRIGGERS:
         return "client"
-    if "g_form" in content or "g_scratchpad" in content:
+    if hits & _GLOBAL_TRIGGERS:
         return "client"
-    if any(token in content for token in ("class.create", "prototype =", "gs.", "gliderecord")):
-        if "g_form" not in content:
-            return "script_include"
+    if hits & _INCLUDE_TRIGGERS and "g_form" not in hits:
+        return "script_include"
     return "unknown"
 
 
-def classify_js_role(
-    snippet_path: str,
-    rel_path: str,
-    filename: str,
-    code: str,
-    readme_lines: List[str],
-) -> str:
-    lower_path = snippet_path.lower()
-    lower_rel = rel_path.lower()
-    lower_name = filename.lower()
-    content = code.lower()
+def _role_script_include(name_low, rel_low, content_low, norm_lines):
+    return "script_include"
 
-    if "script include" in lower_path or "script include" in lower_rel:
-        return "script_include"
-    if "ux client script include" in lower_path:
+
+def _role_server(name_low, rel_low, content_low, norm_lines):
+    return "server"
+
+
+def _role_client_scripts(name_low, rel_low, content_low, norm_lines):
+    guess = infer_js_role(name_low, content_low, norm_lines)
+    return "client" if guess != "script_include" else "script_include"
+
+
+def _role_catalog_client(name_low, rel_low, content_low, norm_lines):
+    guess = infer_js_role(name_low, content_low, norm_lines)
+    if guess in ("script_include", "client"):
+        return guess
+    return "server"
+
+
+def _role_portal_widget(name_low, rel_low, content_low, norm_lines):
+    if "client" in name_low:
+        return "client"
+    if "server" in name_low:
+        return "portal_server"
+    if "link" in name_low:
+        return "client"
+    return "client" if "g_form" in content_low else "portal_server"
+
+
+def _role_portal(name_low, rel_low, content_low, norm_lines):
+    if "client" in name_low:
+        return "client"
+    if "server" in name_low:
+        return "portal_server"
+    if "controller" in name_low:
+        return "client"
+    return "client" if "g_form" in content_low else "portal_server"
+
+
+def _role_ui_action(name_low, rel_low, content_low, norm_lines):
+    if "script include" in name_low or "scriptinclude" in rel_low:
         return "script_include"
-    if "client scripts" in lower_path or "ux client scripts" in lower_path:
-        guess = infer_js_role(filename, code, readme_lines)
-        return "client" if guess != "script_include" else "script_include"
-    if "catalog client script" in lower_path:
-        guess = infer_js_role(filename, code, readme_lines)
-        if guess == "script_include":
-            return "script_include"
-        if guess == "client":
-            return "client"
-    if "service portal widgets" in lower_path:
-        if "client" in lower_name:
-            return "client"
-        if "server" in lower_name:
-            return "portal_server"
-        if "link" in lower_name:
-            return "client"
-        return "client" if "g_form" in content else "portal_server"
-    if "service portal" in lower_path:
-        if "client" in lower_name:
-            return "client"
-        if "server" in lower_name:
-            return "portal_server"
-        if "controller" in lower_name:
-            return "client"
-        return "client" if "g_form" in content else "portal_server"
-    if "ui actions" in lower_path:
-        if "script include" in lower_name or "scriptinclude" in lower_rel:
-            return "script_include"
-        if "client" in lower_name or "workspace" in lower_name:
-            return "client"
-        if "server" in lower_name:
-            return "server"
-        if "g_form" in content:
-            return "client"
-        return "server"
-    if "scheduled jobs" in lower_path or "background scripts" in lower_path:
-        return "server"
-    if "transform map scripts" in lower_path:
-        return "server"
-    if "core servicenow apis" in lower_path:
-        return "server"
-    if "integration" in lower_path and "mail scripts" in lower_path:
+    if "client" in name_low or "workspace" in name_low:
+        return "client"
+    if "server" in name_low:
         return "server"
-    guess = infer_js_role(filename, code, readme_lines)
+    if "g_form" in content_low:
+        return "client"
+    return "server"
+
+
+# Known (category, subcategory) pairs map straight to a disposition so the
+# hot path is one dict lookup instead of a cascade of substring scans over
+# the snippet path.
+CATEGORY_ROLE = {
+    ("Server-Side Components", "Script Includes"): _role_script_include,
+    ("Client-Side Components", "UX Client Script Include"): _role_script_include,
+    ("Client-Side Components", "Client Scripts"): _role_client_scripts,
+    ("Client-Side Components", "UX Client Scripts"): _role_client_scripts,
+    ("Client-Side Components", "Catalog Client Script"): _role_catalog_client,
+    ("Modern Development", "Service Portal Widgets"): _role_portal_widget,
+    ("Modern Development", "Service Portal"): _role_portal,
+    ("Client-Side Components", "UI Actions"): _role_ui_action,
+    ("Server-Side Components", "Scheduled Jobs"): _role_server,
+    ("Server-Side Components", "Background Scripts"): _role_server,
+    ("Server-Side Components", "Transform Map Scripts"): _role_server,
+    ("Integration", "Mail Scripts"): _role_server,
+}
+
+
+def classify_js_role(
+    category: str,
+    subcategory: str,
+    rel_low: str,
+    name_low: str,
+    content_low: str,
+    norm_lines: List[Tuple[str, str]],
+) -> str:
+    if "script include" in rel_low:
+        return "script_include"
+    handler = CATEGORY_ROLE.get((category, subcategory))
+    if handler is None and category == "Core ServiceNow APIs":
+        handler = _role_server
+    if handler is not None:
+        return handler(name_low, rel_low, content_low, norm_lines)
+    guess = infer_js_role(name_low, content_low, norm_lines)
     if guess == "client":
         return "client"
     if guess == "script_include":
@@ -492,12 +690,12 @@ def classify_js_role(
     return "server"
 
 
+_BASE_SET = frozenset(BASE_FOLDERS + [ASSET_FOLDER, PAGES_FOLDER])
+
+
 def get_base_folder(path: str) -> Optional[str]:
-    for base in BASE_FOLDERS + [ASSET_FOLDER, PAGES_FOLDER]:
-        prefix = f"{base}/"
-        if path.startswith(prefix):
-            return base
-    return None
+    head = path.partition("/")[0]
+    return head if head in _BASE_SET else None
 
 
 def resolve_snippet_root(base: str, path: str) -> Optional[str]:
@@ -545,10 +743,14 @@ def gather_pages(tree: List[Dict]) -> List[str]:
     ]
 
 
+# Shared blank row; dict.copy() is a single C-level table copy versus
+# rebuilding 47 keys per snippet. append_value upgrades fields to lists
+# lazily, so sharing the empty-string values is safe.
+_ROW_TEMPLATE: Dict[str, object] = {field: "" for field in ALL_FIELDS}
+
+
 def blank_row(name: str, script_type: str, category: str, subcategory: str, repo_path: str) -> Dict[str, object]:
-    row: Dict[str, object] = {field: "" for field in ALL_FIELDS}
-    for field in LIST_FIELDS:
-        row[field] = []
+    row = _ROW_TEMPLATE.copy()
     row["name"] = name
     row["script_type"] = script_type
     row["repo_path"] = repo_path
@@ -557,19 +759,21 @@ def blank_row(name: str, script_type: str, category: str, subcategory: str, repo
     return row
 
 
-def append_value(row: Dict[str, object], field: str, value: str, sep: str = "\n\n") -> None:
+def append_value(row: Dict[str, object], field: str, value: str) -> None:
     if not value:
         return
     trimmed = value.strip()
     if not trimmed:
         return
-    if field in LIST_FIELDS:
-        row[field].append(trimmed)
+    current = row[field]
+    if isinstance(current, list):
+        current.append(trimmed)
+    elif current:
+        # Field was overwritten with a scalar (README metadata); resume
+        # list accumulation from there.
+        row[field] = [current, trimmed]
     else:
-        if row.get(field):
-            row[field] = f"{row[field]}{sep}{trimmed}"
-        else:
-            row[field] = trimmed
+        row[field] = [trimmed]
 
 
 def assign_js(row: Dict[str, object], role: str, content: str) -> None:
@@ -593,17 +797,8 @@ def finalize_row(
     script_type: str,
     category: str,
     subcategory: str,
+    md_lines: Optional[List[str]] = None,
 ) -> Dict[str, str]:
-    text_fields = {
-        key: value if isinstance(value, list) else [value]
-        for key, value in row.items()
-        if key in LIST_FIELDS
-    }
-
-    for field, values in text_fields.items():
-        cleaned = [v.strip() for v in values if isinstance(v, str) and v.strip()]
-        row[field] = "\n\n".join(cleaned)
-
     for key in ALL_FIELDS:
         if key not in row:
             row[key] = ""
@@ -615,7 +810,7 @@ def finalize_row(
             row[key] = str(row[key])
 
     if not row["description"] and readme_markdown:
-        row["description"] = parse_description(readme_markdown)
+        row["description"] = parse_description(readme_markdown, md_lines)
 
     if not row["client_side_type"]:
         script_body = row["client_script"] or row["client_script_v2"]
@@ -633,7 +828,7 @@ def finalize_row(
     if not row["field_list"]:
         field_candidates = parse_fields_from_code(row["client_script"] or "")
         if field_candidates:
-            row["field_list"] = ", ".join(field_candidates[:3])
+            row["field_list"] = ", ".join(field_candidates)
 
     if category == "Specialized Areas" and not row["type_for_specialized_areas"]:
         row["type_for_specialized_areas"] = subcategory
@@ -650,7 +845,10 @@ def finalize_row(
         if not row["link"]:
             link_func = extract_link_function(row["client_script"])
             if link_func:
-                append_value(row, "link", link_func)
+                # The list-join pass above has already run; assign the
+                # string directly instead of append_value, which would
+                # re-wrap the field in a list.
+                row["link"] = link_func
 
     if not row["client_callable"] and script_type in {"Script Include", "UX Script Include"}:
         if "AbstractAjaxProcessor" in (row["script_include"] or ""):
@@ -669,7 +867,8 @@ def process_snippet(snippet_path: str, info: Dict[str, List[str]]) -> Dict[str,
 
     readme_md = fetch_raw(info["readme"]) if info.get("readme") else ""
     readme_lines = readme_md.splitlines()
-    metadata = parse_readme_metadata(readme_md)
+    norm_lines = normalize_readme_lines(readme_lines)
+    metadata = parse_readme_metadata(readme_md, readme_lines)
     code_blocks = extract_code_blocks(readme_md)
 
     row = blank_row(
@@ -729,7 +928,14 @@ def process_snippet(snippet_path: str, info: Dict[str, List[str]]) -> Dict[str,
             append_value(row, "notes", content)
             continue
         if ext == ".js":
-            role = classify_js_role(snippet_path, rel, filename, content, readme_lines)
+            role = classify_js_role(
+                category,
+                subcategory,
+                rel.lower(),
+                filename.lower(),
+                content.lower(),
+                norm_lines,
+            )
             assign_js(row, role, content)
             continue
 
@@ -738,34 +944,54 @@ def process_snippet(snippet_path: str, info: Dict[str, List[str]]) -> Dict[str,
         for extra in code_blocks[1:]:
             append_value(row, "code2", extra)
 
-    return finalize_row(row, readme_md, script_type, category, subcategory)
+    return finalize_row(
+        row, readme_md, script_type, category, subcategory, md_lines=readme_lines
+    )
 
 
 def process_assets(asset_paths: List[str]) -> List[Dict[str, str]]:
     rows: List[Dict[str, str]] = []
-    for path in sorted(asset_paths):
+    # Drop binary assets (images, fonts) up front; they would only produce
+    # empty rows and their fetches would be thrown away anyway.
+    text_paths = [
+        path
+        for path in sorted(asset_paths)
+        if os.path.splitext(path.lower())[1] in TEXT_EXTENSIONS
+    ]
+    for path in text_paths:
         name = os.path.basename(path)
         rel = path[len(f"{ASSET_FOLDER}/") :] if path.startswith(f"{ASSET_FOLDER}/") else path
         subcategory = rel.split("/")[0] if "/" in rel else "root"
         script_type = "Asset"
         row = blank_row(name, script_type, ASSET_FOLDER, subcategory, path)
         _, ext = os.path.splitext(path.lower())
-        if ext in TEXT_EXTENSIONS:
-            content = fetch_raw(path)
-            if ext == ".js":
-                append_value(row, "code", content)
-            elif ext in {".css", ".scss"}:
-                append_value(row, "css", content)
-            elif ext in {".html", ".htm"}:
-                append_value(row, "html", content)
-            else:
-                append_value(row, "notes", content)
+        content = fetch_raw(path)
+        if ext == ".js":
+            append_value(row, "code", content)
+        elif ext in {".css", ".scss"}:
+            append_value(row, "css", content)
+        elif ext in {".html", ".htm"}:
+            append_value(row, "html", content)
+        else:
+            append_value(row, "notes", content)
         rows.append(
             finalize_row(row, "", script_type, ASSET_FOLDER, subcategory)
         )
     return rows
 
 
+def extract_title(html: str) -> str:
+    """Pull the <title> text with two C-level find calls; no regex walk."""
+    lowered = html.lower()
+    start = lowered.find("<title>")
+    if start < 0:
+        return ""
+    end = lowered.find("</title>", start + 7)
+    if end < 0:
+        return ""
+    return html[start + 7 : end].strip()
+
+
 def process_pages(page_paths: List[str]) -> List[Dict[str, str]]:
     rows: List[Dict[str, str]] = []
     for path in sorted(page_paths):
@@ -775,42 +1001,80 @@ def process_pages(page_paths: List[str]) -> List[Dict[str, str]]:
         row = blank_row(name, "Static Page", PAGES_FOLDER, "", path)
         content = fetch_raw(path)
         append_value(row, "html", content)
-        match = re.search(r"<title>(.*?)</title>", content, flags=re.IGNORECASE | re.DOTALL)
-        if match:
-            row["description"] = match.group(1).strip()
+        title = extract_title(content)
+        if title:
+            row["description"] = title
         rows.append(finalize_row(row, "", "Static Page", PAGES_FOLDER, ""))
     return rows
 
 
+def gather_fetch_paths(
+    snippets: Dict[str, Dict[str, List[str]]],
+    asset_paths: List[str],
+    page_paths: List[str],
+) -> List[str]:
+    paths: List[str] = []
+    for info in snippets.values():
+        if info.get("readme"):
+            paths.append(info["readme"])
+        for path in info.get("files", []):
+            _, ext = os.path.splitext(path.lower())
+            if ext in TEXT_EXTENSIONS:
+                paths.append(path)
+    for path in asset_paths:
+        _, ext = os.path.splitext(path.lower())
+        if ext in TEXT_EXTENSIONS:
+            paths.append(path)
+    paths.extend(p for p in page_paths if p.lower().endswith(".html"))
+    return paths
+
+
 def scrape_all() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = load_tarball()
+    if tree is None:
+        sha = get_branch_sha()
+        tree = list_tree_recursive(sha)
 
     snippets = group_snippets(tree)
-    rows: List[Dict[str, str]] = []
+    asset_paths = gather_assets(tree)
+    page_paths = gather_pages(tree)
+    # No-op after a successful tarball load; otherwise fan out per-file fetches.
+    prefetch_raw(gather_fetch_paths(snippets, asset_paths, page_paths))
+
+    # Accumulate column-wise so pandas receives already-columnar data and
+    # skips the row-major dict transposition and dtype inference per cell.
+    columns: Dict[str, List[str]] = {field: [] for field in ALL_FIELDS}
+
+    def add_row(row: Dict[str, str]) -> None:
+        for field in ALL_FIELDS:
+            columns[field].append(row.get(field, ""))
 
     for snippet_path in sorted(snippets.keys()):
         row = process_snippet(snippet_path, snippets[snippet_path])
         if row:
-            rows.append(row)
+            add_row(row)
 
-    rows.extend(process_assets(gather_assets(tree)))
-    rows.extend(process_pages(gather_pages(tree)))
+    for row in process_assets(asset_paths):
+        add_row(row)
+    for row in process_pages(page_paths):
+        add_row(row)
 
-    df = pd.DataFrame(rows)
-    ordered = [field for field in ALL_FIELDS if field in df.columns]
-    remaining = [c for c in df.columns if c not in ordered]
-    return df[ordered + remaining]
+    return pd.DataFrame(columns, columns=ALL_FIELDS)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Scrape all ServiceNow code snippets into a unified dataset."
     )
+    parser.add_argument(
+        "--out-parquet",
+        default="spreadsheets/all_scripts.parquet",
+        help="Output Parquet file path (primary artifact).",
+    )
     parser.add_argument(
         "--out-xlsx",
-        default="spreadsheets/all_scripts.xlsx",
-        help="Output Excel file path.",
+        default=None,
+        help="Optional Excel output path (slow to write; off by default).",
     )
     parser.add_argument(
         "--out-csv",
@@ -821,13 +1085,23 @@ def main() -> None:
 
     df = scrape_all()
 
-    os.makedirs(os.path.dirname(args.out_xlsx), exist_ok=True)
-    df.to_excel(args.out_xlsx, index=False)
+    os.makedirs(os.path.dirname(args.out_parquet) or ".", exist_ok=True)
+    df.to_parquet(args.out_parquet, compression="zstd", engine="pyarrow")
+    print(f"Saved {len(df)} records to {args.out_parquet}")
     if args.out_csv:
         df.to_csv(args.out_csv, index=False)
-    print(f"Saved {len(df)} records to {args.out_xlsx}")
-    if args.out_csv:
         print(f"Saved CSV export to {args.out_csv}")
+    if args.out_xlsx:
+        os.makedirs(os.path.dirname(args.out_xlsx) or ".", exist_ok=True)
+        # constant_memory streams one row at a time instead of building the
+        # whole worksheet DOM for these long string cells.
+        with pd.ExcelWriter(
+            args.out_xlsx,
+            engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": True}},
+        ) as writer:
+            df.to_excel(writer, index=False)
+        print(f"Saved Excel export to {args.out_xlsx}")
 
 
 if __name__ == "__main__":
@@ -1,53 +1,19 @@
-import os, re, time, argparse
+import argparse
 from collections import defaultdict
-from dotenv import load_dotenv
 from typing import Dict, List
-import requests, pandas as pd
+import pandas as pd
 
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
+from snippets_common import (
+    OUTPUT_EXTENSIONS,
+    extract_code_from_readme,
+    fetch_all,
+    list_folder_tree,
+    write_output,
+)
 
 # Repo folder that holds all background scripts
 FOLDER = "Server-Side Components/Background Scripts"
 
-API_BASE = "https://api.github.com"
-RAW_BASE = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    """HTTP request with retries/backoff for rate limits."""
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
-
-
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
-
 
 def group_background_scripts_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
     """
@@ -60,14 +26,16 @@ def group_background_scripts_files(tree: List[Dict]) -> Dict[str, Dict[str, str]
         "CODE2": ""
     })
     prefix = f"{FOLDER}/"
-    for node in tree:
-        if node.get("type") != "blob":
-            continue
-        path = node.get("path", "")
-        if not path.startswith(prefix):
-            continue
-
-        rel = path[len(prefix):]  # e.g., "Example Name/README.md"
+    prefix_len = len(prefix)
+    # Pre-filter once; the per-path loop below no longer pays two string
+    # checks for every unrelated blob in the tree.
+    paths = [
+        node.get("path", "")
+        for node in tree
+        if node.get("type") == "blob" and node.get("path", "").startswith(prefix)
+    ]
+    for path in paths:
+        rel = path[prefix_len:]  # e.g., "Example Name/README.md"
         parts = rel.split("/")
         if len(parts) < 2:
             continue
@@ -87,24 +55,10 @@ def group_background_scripts_files(tree: List[Dict]) -> Dict[str, Dict[str, str]
     return grouped
 
 
-def extract_code_from_readme(readme: str) -> str:
-    """
-    Extract JavaScript code from README.md code blocks.
-    Looks for ```javascript or ```js blocks.
-    """
-    pattern = r'```(?:javascript|js)\s*\n(.*?)\n```'
-    matches = re.findall(pattern, readme, re.DOTALL)
-    if matches:
-        return matches[0].strip()  # Return the first/main code block
-    return ""
-
-
-def build_row(name: str, files: Dict[str, str]) -> Dict[str, str]:
-    readme = fetch_raw(files["README"]) if files["README"] else ""
-    code1_path = files["CODE1"]
-    code2_path = files["CODE2"]
-    code1 = fetch_raw(code1_path) if code1_path else ""
-    code2 = fetch_raw(code2_path) if code2_path else "" 
+def build_row(name: str, files: Dict[str, str], raw: Dict[str, str]) -> Dict[str, str]:
+    readme = raw.get(files["README"], "")
+    code1 = raw.get(files["CODE1"], "")
+    code2 = raw.get(files["CODE2"], "")
 
     # If no code files, try extracting from README
     if not code1:
@@ -121,30 +75,39 @@ def build_row(name: str, files: Dict[str, str]) -> Dict[str, str]:
 
 
 def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = list_folder_tree(FOLDER)
     grouped = group_background_scripts_files(tree)
 
-    rows = []
+    # Fan the downloads out up front; build_row then only looks up text.
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all(
+        [p for files in grouped.values() for p in (files["README"], files["CODE1"], files["CODE2"])],
+        shas,
+    )
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in ("title", "description", "code", "repo_path")}
     for folder, files in sorted(grouped.items()):
         if files["README"]:  # Only include if README exists
-            rows.append(build_row(folder, files))
+            row = build_row(folder, files, raw)
+            for key, values in cols.items():
+                values.append(row[key])
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape Background Scripts from code-snippets repo")
-    ap.add_argument("--out", default="background_scripts.xlsx", help="Output .xlsx filename")
+    ap.add_argument("--out", default=None, help="Output filename (default derives from --format)")
+    ap.add_argument("--format", choices=["feather", "parquet", "csv", "xlsx"], default="feather",
+                    help="Output format; feather is the fastest to write and read back")
     args = ap.parse_args()
+    out = args.out or "background_scripts" + OUTPUT_EXTENSIONS[args.format]
 
     df = scrape()
-    df = df[[
-        "title", "description", "code", "repo_path"
-    ]]
-
-    df.to_excel(args.out, index=False)
-    print(f"Saved {len(df)} background scripts to {args.out}")
+    write_output(df, out, args.format)
+    print(f"Saved {len(df)} background scripts to {out}")
 
 
 if __name__ == "__main__":
@@ -1,62 +1,33 @@
-import os, re, time, argparse
+import os, re, argparse
 from collections import defaultdict
-from dotenv import load_dotenv
 from typing import Any, Dict, List, Tuple
-import requests, pandas as pd
-
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
+import pandas as pd
+
+from snippets_common import (
+    OUTPUT_EXTENSIONS,
+    combine_scripts,
+    fetch_all,
+    list_folder_tree,
+    split_js_files,
+    write_output,
+)
 
 FOLDER = "Client-Side Components/Catalog Client Script"   # repo folder
 
-API_BASE = "https://api.github.com"
-RAW_BASE = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
-
-
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
-
 
 def group_files(tree: List[Dict]) -> Dict[str, Dict[str, Any]]:
     grouped = defaultdict(lambda: {"readme": "", "js": []})
     prefix = f"{FOLDER}/"
-    for node in tree:
-        if node.get("type") != "blob":
-            continue
-        path = node.get("path", "")
-        if not path.startswith(prefix):
-            continue
-        rel = path[len(prefix):]
+    prefix_len = len(prefix)
+    # Pre-filter once; the per-path loop below no longer pays two string
+    # checks for every unrelated blob in the tree.
+    paths = [
+        node.get("path", "")
+        for node in tree
+        if node.get("type") == "blob" and node.get("path", "").startswith(prefix)
+    ]
+    for path in paths:
+        rel = path[prefix_len:]
         parts = rel.split("/")
         if len(parts) != 2:
             continue
@@ -70,233 +41,141 @@ def group_files(tree: List[Dict]) -> Dict[str, Dict[str, Any]]:
 
 
 # -------- README parsers --------
+# All patterns are compiled once at module scope; re's internal cache still
+# re-hashes the pattern string on every call inside the hot loops.
 
-def grab(md: str, patterns: List[str]) -> str:
-    for pat in patterns:
-        m = re.search(pat, md)
-        if m:
-            return m.group(1).strip()
-    return ""
+TYPE_TOKEN_RES = {
+    t: re.compile(rf"\b{t}\b", re.IGNORECASE) for t in ("onLoad", "onChange", "onSubmit")
+}
+TYPE_RE = re.compile(r"(?i)\btype\s*[:\-]\s*([A-Za-z]+)")
 
 
 def parse_type(md: str) -> str:
-    common = ["onLoad", "onChange", "onSubmit"]
-    for t in common:
-        if re.search(rf"\b{t}\b", md, re.IGNORECASE):
+    for t, pat in TYPE_TOKEN_RES.items():
+        if pat.search(md):
             return t
-    m = re.search(r"(?i)\btype\s*[:\-]\s*([A-Za-z]+)", md)
+    m = TYPE_RE.search(md)
     return (m.group(1) if m else "") or ""
 
 
-def parse_applies_to(md: str) -> str:
-    return grab(md, [
-        r"(?i)\bapplies\s*to\s*[:\-]\s*(.+)",
-        r"(?i)\btable\s*[:\-]\s*(catalog\s*item|sc_cat_item|item)",
-    ])
-
-
-def parse_ui_type(md: str) -> str:
-    return grab(md, [
-        r"(?i)\bui\s*type\s*[:\-]\s*([A-Za-z ]+)",
-    ])
-
-
-def parse_sys_scope(md: str) -> str:
-    return grab(md, [
-        r"(?i)\bapplication\s*\|\s*sys_scope\s*[:\-]\s*(.+)",
-        r"(?i)\bsys\s*scope\s*[:\-]\s*(.+)",
-        r"(?i)\bapplication\s*[:\-]\s*(.+)"
-    ])
-
-
-def parse_cat_item(md: str) -> str:
-    return grab(md, [
-        r"(?i)\bcat(?:alog)?\s*item\s*[:\-]\s*([^\n]+)",
-    ])
-
-
-def parse_name(md: str, folder: str) -> str:
-    v = grab(md, [r"(?i)\bname\s*[:\-]\s*([^\n]+)"])
-    return v or folder
-
+# One compiled alternation covers every "Key: value" line these READMEs use;
+# a single line scan replaces the per-field grab() passes.
+_METADATA_RE = re.compile(
+    r"(?i)^\s*(name|applies\s*to|ui\s*type|sys\s*scope|application"
+    r"|cat(?:alog)?\s*item|table|type|description)\s*[:\-]\s*(.+)$"
+)
 
-def parse_description(md: str) -> str:
-    m = re.search(r"(?i)\bdescription\s*[:\-]\s*(.+)", md)
-    if m:
-        return m.group(1).strip()
-    # fallback: first non-heading, non-empty, non-metadata line
+# Includes the squashed spellings ("UIType:") the regex's \s* tolerates.
+_METADATA_KEYS = {
+    "name": "name",
+    "applies to": "applies_to",
+    "appliesto": "applies_to",
+    "ui type": "ui_type",
+    "uitype": "ui_type",
+    "sys scope": "sys_scope",
+    "sysscope": "sys_scope",
+    "application": "sys_scope",
+    "cat item": "cat_item",
+    "catitem": "cat_item",
+    "catalog item": "cat_item",
+    "catalogitem": "cat_item",
+    "type": "type",
+    "description": "description",
+}
+
+# A "Table:" line only counts as applies_to when it names a catalog item.
+_TABLE_ITEM_RE = re.compile(r"(?i)^(catalog\s*item|sc_cat_item|item)\b")
+
+
+def parse_metadata(md: str) -> Dict[str, str]:
+    """Fill every Key: value field from one pass over the lines."""
+    meta: Dict[str, str] = {}
+    fallback = ""
     for line in md.splitlines():
         t = line.strip()
-        if not t or t.startswith("#"): 
-            continue
-        if re.match(r"(?i)^(name|applies to|ui type|type|cat\s*item|application|sys scope)\s*[:\-]", t):
+        if not t:
             continue
-        return t
-    return ""
-
-
-# -------- Script categorization helpers --------
-
-CLIENT_NAME_HINTS = (
-    "client",
-    "onload",
-    "onchange",
-    "onsubmit",
-    "oncelledit",
-    "catalog",
-    "portal",
-    "script",
-    "mrvs",
-)
-
-INCLUDE_NAME_HINTS = (
-    "include",
-    "ajax",
-    "util",
-    "utils",
-    "provider",
-    "processor",
-    "server",
-)
-
-
-def _normalize_token(value: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", value.lower())
-
-
-def readme_mentions(filename: str, lines: List[str], keyword: str) -> bool:
-    """Return True if README references filename alongside keyword (case-insensitive)."""
-    if not lines:
-        return False
-    token = _normalize_token(os.path.splitext(filename)[0])
-    if not token:
-        return False
-    needle = keyword.lower()
-    for line in lines:
-        low = line.lower()
-        if needle in low:
-            if token in _normalize_token(line):
-                return True
-    return False
-
-
-def infer_js_role(filename: str, code: str, readme_lines: List[str]) -> str:
-    """Best-effort classification of JS files into client vs. script include."""
-    name = filename.lower()
-    content = code.lower()
-
-    if readme_mentions(filename, readme_lines, "script include") or readme_mentions(filename, readme_lines, "server script"):
-        return "script_include"
-    if readme_mentions(filename, readme_lines, "client script"):
-        return "client"
-
-    if any(hint in name for hint in INCLUDE_NAME_HINTS):
-        if "g_form" not in content:
-            return "script_include"
-
-    if any(hint in name for hint in CLIENT_NAME_HINTS):
-        return "client"
-
-    if any(trigger in content for trigger in ("function onload", "function onchange", "function onsubmit", "function oncelledit")):
-        return "client"
-    if "g_form" in content or "g_scratchpad" in content:
-        return "client"
-
-    if "class.create" in content or "prototype =" in content or "gs." in content or "gliderecord" in content:
-        if "g_form" not in content:
-            return "script_include"
-
-    return "unknown"
-
-
-def split_js_files(entries: List[Tuple[str, str]], readme_lines: List[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
-    """Split list of (filename, code) pairs into client scripts and script includes."""
-    clients: List[Tuple[str, str]] = []
-    includes: List[Tuple[str, str]] = []
-    unknown: List[Tuple[str, str]] = []
-
-    for filename, code in entries:
-        role = infer_js_role(filename, code, readme_lines)
-        if role == "client":
-            clients.append((filename, code))
-        elif role == "script_include":
-            includes.append((filename, code))
-        else:
-            unknown.append((filename, code))
-
-    if not clients and unknown:
-        clients.append(unknown.pop(0))
-    includes.extend(unknown)
-
-    return clients, includes
-
-
-def combine_scripts(entries: List[Tuple[str, str]]) -> str:
-    """Combine multiple script files into a single string (joined by blank lines)."""
-    if not entries:
-        return ""
-    parts = []
-    for filename, code in sorted(entries, key=lambda item: item[0].lower()):
-        stripped = code.strip()
-        if not stripped:
-            continue
-        parts.append(stripped)
-    return "\n\n".join(parts)
+        m = _METADATA_RE.match(t)
+        if m:
+            raw_key = " ".join(m.group(1).lower().split())
+            value = m.group(2).strip()
+            if raw_key == "table":
+                item = _TABLE_ITEM_RE.match(value)
+                if not item:
+                    continue
+                meta.setdefault("applies_to", item.group(1))
+                continue
+            field = _METADATA_KEYS.get(raw_key)
+            if field is None:
+                # The regex tolerates squashed spellings (e.g. "UIType:")
+                # the key map doesn't list; skip rather than abort.
+                continue
+            meta.setdefault(field, value)
+        elif not fallback and not t.startswith("#"):
+            fallback = t
+    if "description" not in meta and fallback:
+        meta["description"] = fallback
+    return meta
 
 
 def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = list_folder_tree(FOLDER)
     grouped = group_files(tree)
 
-    rows = []
+    # Fan the downloads out up front; the per-folder loop below then only
+    # does dict lookups instead of serial round-trips.
+    paths: List[str] = []
+    for files in grouped.values():
+        if files["readme"]:
+            paths.append(files["readme"])
+        paths.extend(files["js"])
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all(paths, shas)
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in (
+        "title", "applies_to", "ui_type", "sys_scope", "type", "cat_item",
+        "description", "client_script", "script_include",
+    )}
     for folder, files in sorted(grouped.items()):
-        md  = fetch_raw(files["readme"]) if files["readme"] else ""
+        md  = raw.get(files["readme"], "") if files["readme"] else ""
         readme_lines = md.splitlines()
 
         js_entries: List[Tuple[str, str]] = []
         for path in files["js"]:
             filename = os.path.basename(path)
-            js_entries.append((filename, fetch_raw(path)))
+            js_entries.append((filename, raw.get(path, "")))
 
         client_entries, include_entries = split_js_files(js_entries, readme_lines)
         client_script = combine_scripts(client_entries)
         script_include = combine_scripts(include_entries)
 
-        rows.append({
-            "title":       parse_name(md, folder),
-            "applies_to":  parse_applies_to(md) or "A Catalog Item",
-            "ui_type":     parse_ui_type(md) or "All",
-            "sys_scope":   parse_sys_scope(md),
-            "type":        parse_type(md),
-            "cat_item":    parse_cat_item(md),
-            "description": parse_description(md),
-            "client_script": client_script,
-            "script_include": script_include,
-        })
+        meta = parse_metadata(md)
+        cols["title"].append(meta.get("name") or folder)
+        cols["applies_to"].append(meta.get("applies_to") or "A Catalog Item")
+        cols["ui_type"].append(meta.get("ui_type") or "All")
+        cols["sys_scope"].append(meta.get("sys_scope", ""))
+        cols["type"].append(parse_type(md))
+        cols["cat_item"].append(meta.get("cat_item", ""))
+        cols["description"].append(meta.get("description", ""))
+        cols["client_script"].append(client_script)
+        cols["script_include"].append(script_include)
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape Catalog Client Scripts")
-    ap.add_argument("--out", default="catalog_client_scripts.xlsx", help="Output .xlsx filename")
+    ap.add_argument("--out", default=None, help="Output filename (default derives from --format)")
+    ap.add_argument("--format", choices=["feather", "parquet", "csv", "xlsx"], default="feather",
+                    help="Output format; feather is the fastest to write and read back")
     args = ap.parse_args()
+    out = args.out or "catalog_client_scripts" + OUTPUT_EXTENSIONS[args.format]
 
     df = scrape()
-    df = df[[
-        "title",
-        "applies_to",
-        "ui_type",
-        "sys_scope",
-        "type",
-        "cat_item",
-        "description",
-        "client_script",
-        "script_include",
-    ]]
-    df.to_excel(args.out, index=False)
-    print(f"Saved {len(df)} rows to {args.out}")
+    write_output(df, out, args.format)
+    print(f"Saved {len(df)} rows to {out}")
 
 
 if __name__ == "__main__":
@@ -1,62 +1,35 @@
-import os, re, time, argparse
-from dotenv import load_dotenv
-from collections import defaultdict, Counter
+import os, re, argparse
+from collections import Counter, defaultdict
+from functools import lru_cache
 from typing import Any, Dict, List, Tuple
-import requests, pandas as pd
-
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
-
-FOLDER      = "Client-Side Components/Client Scripts"   # human readable
-API_BASE    = "https://api.github.com"
-RAW_BASE    = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
-
+import pandas as pd
+
+from snippets_common import (
+    OUTPUT_EXTENSIONS,
+    combine_scripts,
+    fetch_all,
+    list_folder_tree,
+    split_js_files,
+    write_output,
+)
 
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
+FOLDER = "Client-Side Components/Client Scripts"   # human readable
 
 
 def group_files(tree: List[Dict]) -> Dict[str, Dict[str, Any]]:
     """Return mapping: <folder> -> {'readme': path, 'js': [paths]} under our client-scripts folder."""
     grouped = defaultdict(lambda: {"readme": "", "js": []})
     prefix = f"{FOLDER}/"
-    for node in tree:
-        if node.get("type") != "blob":
-            continue
-        path = node.get("path", "")
-        if not path.startswith(prefix):
-            continue
-        rel = path[len(prefix):]  # e.g., "Change Label of Field/README.md"
+    prefix_len = len(prefix)
+    # Pre-filter once; the per-path loop below no longer pays two string
+    # checks for every unrelated blob in the tree.
+    paths = [
+        node.get("path", "")
+        for node in tree
+        if node.get("type") == "blob" and node.get("path", "").startswith(prefix)
+    ]
+    for path in paths:
+        rel = path[prefix_len:]  # e.g., "Change Label of Field/README.md"
         parts = rel.split("/")
         if len(parts) != 2:
             continue
@@ -70,216 +43,142 @@ def group_files(tree: List[Dict]) -> Dict[str, Dict[str, Any]]:
 
 
 # --------- Parsers ---------
+# Every pattern used inside the per-folder loops is compiled once at module
+# scope; re's internal cache still re-hashes the pattern string on each call.
+
+EVENTS = ["onChange", "onLoad", "onSubmit", "onCellEdit", "onValueChange"]
+EVENT_RES = {ev: re.compile(rf"\b{re.escape(ev)}\b", re.IGNORECASE) for ev in EVENTS}
+TYPE_EVENT_RE = re.compile(r"(?i)\b(type|event)\s*[:\-]\s*([A-Za-z]+)")
 
+
+@lru_cache(maxsize=None)
 def parse_event(md: str) -> str:
-    events = ["onChange", "onLoad", "onSubmit", "onCellEdit", "onValueChange"]
-    for ev in events:
-        if re.search(rf"\b{re.escape(ev)}\b", md, re.IGNORECASE):
+    for ev, pat in EVENT_RES.items():
+        if pat.search(md):
             return ev
-    m = re.search(r"(?i)\b(type|event)\s*[:\-]\s*([A-Za-z]+)", md)
+    m = TYPE_EVENT_RE.search(md)
     return (m.group(2) if m else "") or ""
 
 
-TABLE_PATTERNS = [
-    r"(?i)\btable\s*[:\-]\s*([A-Za-z0-9_\.]+)",
-    r"(?i)\bapplies\s*to\s*[:\-]\s*([A-Za-z0-9_\.]+)",
-    r"(?i)\bon\s+table\s*[:\-]\s*([A-Za-z0-9_\.]+)",
-]
-def parse_table_from_readme(md: str) -> str:
-    for p in TABLE_PATTERNS:
-        m = re.search(p, md)
-        if m:
-            return m.group(1).strip()
-    return ""
-
+# One compiled alternation covers every "Key: value" line these READMEs use;
+# a single line scan replaces the old description/table/field passes.
+_METADATA_RE = re.compile(
+    r"(?i)^\s*(description|table|applies\s*to|on\s+table|field\s*name"
+    r"|element|field|type|event|usage|example)\s*[:\-]\s*(.+)$"
+)
 
-def parse_description(md: str) -> str:
-    m = re.search(r"(?i)\bdescription\s*[:\-]\s*(.+)", md)
-    if m: return m.group(1).strip()
+# Keys mapped to None are recognised (so they don't become the fallback
+# description) but not captured.
+_METADATA_KEYS = {
+    "description": "description",
+    "table": "table",
+    "applies to": "table",
+    "on table": "table",
+    "field name": "field_name",
+    "element": "field_name",
+    "field": "field_name",
+}
+
+_IDENT_RE = re.compile(r"[A-Za-z0-9_\.]+")
+
+
+# Duplicate READMEs across folders hit the cache instead of re-running the
+# line scan; callers only read from the returned dict.
+@lru_cache(maxsize=None)
+def parse_metadata(md: str) -> Dict[str, str]:
+    """Fill description/table/field_name from one pass over the lines."""
+    meta: Dict[str, str] = {}
+    fallback = ""
     for line in md.splitlines():
         t = line.strip()
-        if not t or t.startswith("#"): continue
-        if re.match(r"(?i)^(type|event|usage|example|table|applies to|field\s*name|element)\s*[:\-]", t):
+        if not t:
             continue
-        return t
-    return ""
-
-
-# --- Field name detection ---
-
-# From README (common phrasings)
-FIELD_PATTERNS_MD = [
-    r"(?i)\bfield\s*name\s*[:\-]\s*([A-Za-z0-9_\.]+)",
-    r"(?i)\belement\s*[:\-]\s*([A-Za-z0-9_\.]+)",
-    r"(?i)\bfield\s*[:\-]\s*([A-Za-z0-9_\.]+)",
-]
-
-def parse_field_from_readme(md: str) -> str:
-    for p in FIELD_PATTERNS_MD:
-        m = re.search(p, md)
+        m = _METADATA_RE.match(t)
         if m:
-            return m.group(1).strip()
-    return ""
-
-
-# From JS (scan g_form API for hard-coded element names)
-GF_METHODS = [
-    "getValue", "getControl", "setValue", "setDisplay", "setVisible",
-    "setMandatory", "setReadOnly", "showFieldMsg", "clearValue",
-    "addOption", "removeOption", "addErrorMessage", "addInfoMessage",
-    "clearOptions", "disableAttachment"
-]
+            field = _METADATA_KEYS.get(" ".join(m.group(1).lower().split()))
+            if field is None or field in meta:
+                continue
+            value = m.group(2).strip()
+            if field in ("table", "field_name"):
+                ident = _IDENT_RE.match(value)
+                if not ident:
+                    continue
+                value = ident.group(0)
+            meta[field] = value
+        elif not fallback and not t.startswith("#"):
+            fallback = t
+    if "description" not in meta and fallback:
+        meta["description"] = fallback
+    return meta
+
+
+# From JS (scan g_form API for hard-coded element names). The method
+# alternation is factored by shared prefix (get/set/add/clear...) so the
+# engine rules out most branches after one or two characters instead of
+# retrying 15 literals at every position.
 GF_REGEX = re.compile(
     r"g_form\.(?:"
-    + "|".join(GF_METHODS)
-    + r")\(\s*['\"]([A-Za-z0-9_]+)['\"]",
-    re.MULTILINE
+    r"get(?:Value|Control)"
+    r"|set(?:Value|Display|Visible|Mandatory|ReadOnly)"
+    r"|add(?:Option|ErrorMessage|InfoMessage)"
+    r"|clear(?:Value|Options)"
+    r"|showFieldMsg|removeOption|disableAttachment"
+    r")\(\s*['\"]([A-Za-z0-9_]+)['\"]"
 )
 
 def parse_fields_from_code(js: str) -> List[str]:
-    # Collect candidate element names; return most common(s)
-    candidates = [m.group(1) for m in GF_REGEX.finditer(js)]
-    if not candidates:
+    counts = Counter(m.group(1) for m in GF_REGEX.finditer(js))
+    if not counts:
         # Sometimes authors do: var f = 'short_description'; g_form.getValue(f)
         # This is hard to resolve reliably; skip.
         return []
-    # De-duplicate but keep the most frequent first
-    counts = Counter(candidates)
-    top = [name for name, _ in counts.most_common()]
-    return top
+    # most_common(3) heap-selects the top entries without a full sort.
+    return [name for name, _ in counts.most_common(3)]
+
+
+TABLE_CODE_PATTERNS = [
+    re.compile(r"(?i)//\s*table\s*[:\-]\s*([A-Za-z0-9_\.]+)"),
+    re.compile(r"(?i)/\*\s*table\s*[:\-]\s*([A-Za-z0-9_\.]+)\s*\*/"),
+]
 
 
 def parse_table_from_code(js: str) -> str:
     # Weak hints only
-    m = re.search(r"(?i)//\s*table\s*[:\-]\s*([A-Za-z0-9_\.]+)", js)
-    if m: return m.group(1).strip()
-    m = re.search(r"(?i)/\*\s*table\s*[:\-]\s*([A-Za-z0-9_\.]+)\s*\*/", js)
-    if m: return m.group(1).strip()
+    for p in TABLE_CODE_PATTERNS:
+        m = p.search(js)
+        if m:
+            return m.group(1).strip()
     return ""
 
 
-# -------- Script categorization helpers --------
-
-CLIENT_NAME_HINTS = (
-    "client",
-    "onload",
-    "onchange",
-    "onsubmit",
-    "oncelledit",
-    "onvaluechange",
-    "catalog",
-    "portal",
-    "script",
-)
-
-INCLUDE_NAME_HINTS = (
-    "include",
-    "ajax",
-    "util",
-    "utils",
-    "provider",
-    "server",
-    "processor",
-)
-
-
-def _normalize_token(value: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", value.lower())
-
-
-def readme_mentions(filename: str, lines: List[str], keyword: str) -> bool:
-    """Return True if README references filename alongside keyword (case-insensitive)."""
-    if not lines:
-        return False
-    token = _normalize_token(os.path.splitext(filename)[0])
-    if not token:
-        return False
-    needle = keyword.lower()
-    for line in lines:
-        low = line.lower()
-        if needle in low and token in _normalize_token(line):
-            return True
-    return False
-
-
-def infer_js_role(filename: str, code: str, readme_lines: List[str]) -> str:
-    """Best-effort classification of JS files into client vs. script include."""
-    name = filename.lower()
-    content = code.lower()
-
-    if readme_mentions(filename, readme_lines, "script include") or readme_mentions(filename, readme_lines, "server script"):
-        return "script_include"
-    if readme_mentions(filename, readme_lines, "client script"):
-        return "client"
-
-    if any(hint in name for hint in INCLUDE_NAME_HINTS):
-        if "g_form" not in content:
-            return "script_include"
-
-    if any(hint in name for hint in CLIENT_NAME_HINTS):
-        return "client"
-
-    if any(trigger in content for trigger in ("function onload", "function onchange", "function onsubmit", "function oncelledit", "function onvaluechange")):
-        return "client"
-    if "g_form" in content or "g_scratchpad" in content:
-        return "client"
-
-    if "class.create" in content or "prototype =" in content or "gs." in content or "gliderecord" in content:
-        if "g_form" not in content:
-            return "script_include"
-
-    return "unknown"
-
-
-def split_js_files(entries: List[Tuple[str, str]], readme_lines: List[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
-    """Split list of (filename, code) pairs into client scripts and script includes."""
-    clients: List[Tuple[str, str]] = []
-    includes: List[Tuple[str, str]] = []
-    unknown: List[Tuple[str, str]] = []
-
-    for filename, code in entries:
-        role = infer_js_role(filename, code, readme_lines)
-        if role == "client":
-            clients.append((filename, code))
-        elif role == "script_include":
-            includes.append((filename, code))
-        else:
-            unknown.append((filename, code))
-
-    if not clients and unknown:
-        clients.append(unknown.pop(0))
-    includes.extend(unknown)
-
-    return clients, includes
-
-
-def combine_scripts(entries: List[Tuple[str, str]]) -> str:
-    """Combine multiple script files into a single string (joined by blank lines)."""
-    if not entries:
-        return ""
-    parts = []
-    for filename, code in sorted(entries, key=lambda item: item[0].lower()):
-        stripped = code.strip()
-        if not stripped:
-            continue
-        parts.append(stripped)
-    return "\n\n".join(parts)
-
-
 def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = list_folder_tree(FOLDER)
     grouped = group_files(tree)
 
-    rows = []
+    # Fan the downloads out up front; the per-folder loop below then only
+    # does dict lookups instead of serial round-trips.
+    paths: List[str] = []
+    for files in grouped.values():
+        if files["readme"]:
+            paths.append(files["readme"])
+        paths.extend(files["js"])
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all(paths, shas)
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in (
+        "title", "event", "table", "field_name", "description",
+        "client_script", "script_include",
+    )}
     for folder, files in sorted(grouped.items()):
-        readme_md = fetch_raw(files["readme"]) if files["readme"] else ""
+        readme_md = raw.get(files["readme"], "") if files["readme"] else ""
         readme_lines = readme_md.splitlines()
 
         js_entries: List[Tuple[str, str]] = []
         for path in files["js"]:
             filename = os.path.basename(path)
-            js_entries.append((filename, fetch_raw(path)))
+            js_entries.append((filename, raw.get(path, "")))
 
         client_entries, include_entries = split_js_files(js_entries, readme_lines)
         client_script = combine_scripts(client_entries)
@@ -287,51 +186,44 @@ def scrape() -> pd.DataFrame:
 
         analysis_code = client_script or script_include
 
+        meta = parse_metadata(readme_md) if readme_md else {}
         event = parse_event(readme_md) if readme_md else ""
-        table = parse_table_from_readme(readme_md) if readme_md else ""
+        table = meta.get("table", "")
         if not table and analysis_code:
             table = parse_table_from_code(analysis_code)
 
-        desc  = parse_description(readme_md) if readme_md else ""
+        desc = meta.get("description", "")
 
         # Field name: README first, else infer from code (top 1-3 joined by comma)
-        field_name = parse_field_from_readme(readme_md) if readme_md else ""
+        field_name = meta.get("field_name", "")
         if not field_name and client_script:
             fields = parse_fields_from_code(client_script)
             if fields:
-                # If multiple, list the first 3 (most frequent) comma-separated.
-                field_name = ", ".join(fields[:3])
+                # If multiple, list the top 3 (most frequent) comma-separated.
+                field_name = ", ".join(fields)
 
-        rows.append({
-            "title": folder,
-            "event": event,
-            "table": table,
-            "field_name": field_name,
-            "description": desc,
-            "client_script": client_script,
-            "script_include": script_include,
-        })
+        cols["title"].append(folder)
+        cols["event"].append(event)
+        cols["table"].append(table)
+        cols["field_name"].append(field_name)
+        cols["description"].append(desc)
+        cols["client_script"].append(client_script)
+        cols["script_include"].append(script_include)
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape Client Scripts (with field_name)")
-    ap.add_argument("--out", default="client_scripts.xlsx", help="Output .xlsx filename")
+    ap.add_argument("--out", default=None, help="Output filename (default derives from --format)")
+    ap.add_argument("--format", choices=["feather", "parquet", "csv", "xlsx"], default="feather",
+                    help="Output format; feather is the fastest to write and read back")
     args = ap.parse_args()
+    out = args.out or "client_scripts" + OUTPUT_EXTENSIONS[args.format]
 
     df = scrape()
-    df = df[[
-        "title",
-        "event",
-        "table",
-        "field_name",
-        "description",
-        "client_script",
-        "script_include",
-    ]]
-    df.to_excel(args.out, index=False)
-    print(f"Saved {len(df)} rows to {args.out}")
+    write_output(df, out, args.format)
+    print(f"Saved {len(df)} rows to {out}")
 
 if __name__ == "__main__":
     main()
@@ -1,53 +1,20 @@
-import os, re, time, argparse
+import argparse
 from collections import defaultdict
-from dotenv import load_dotenv
 from typing import Dict, List
-import requests, pandas as pd
+import pandas as pd
 
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
+from snippets_common import (
+    extract_code_from_readme,
+    fetch_all,
+    list_folder_tree,
+    output_is_current,
+    record_head_sha,
+    write_xlsx,
+)
 
 # Repo folder that holds all inbound actions
 FOLDER = "Server-Side Components/Inbound Actions"
 
-API_BASE = "https://api.github.com"
-RAW_BASE = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    """HTTP request with retries/backoff for rate limits."""
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
-
-
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
-
 
 def group_inbound_actions_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
     """
@@ -83,23 +50,11 @@ def group_inbound_actions_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
     return grouped
 
 
-def extract_code_from_readme(readme: str) -> str:
-    """
-    Extract JavaScript code from README.md code blocks.
-    Looks for ```javascript or ```js blocks.
-    """
-    # Regex to match code blocks: ```javascript\ncontent\n```
-    pattern = r'```(?:javascript|js)\s*\n(.*?)\n```'
-    matches = re.findall(pattern, readme, re.DOTALL)
-    if matches:
-        return matches[0].strip()  # Return the first/main code block
-    return ""
-
-
-def build_row(name: str, files: Dict[str, str]) -> Dict[str, str]:
-    readme = fetch_raw(files["README"]) if files["README"] else ""
-    code_path = files["CODE"]
-    code = fetch_raw(code_path) if code_path else extract_code_from_readme(readme)
+def build_row(name: str, files: Dict[str, str], raw: Dict[str, str]) -> Dict[str, str]:
+    readme = raw.get(files["README"], "")
+    # Falls back to the README's inline block for folders whose .js was
+    # skipped in scrape() (or that never had one).
+    code = raw.get(files["CODE"], "") or extract_code_from_readme(readme)
 
     repo_path = f"{FOLDER}/{name}"
 
@@ -112,16 +67,31 @@ def build_row(name: str, files: Dict[str, str]) -> Dict[str, str]:
 
 
 def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = list_folder_tree(FOLDER)
     grouped = group_inbound_actions_files(tree)
 
-    rows = []
+    # Two-stage fetch: READMEs first, then only the .js files whose README
+    # does not already inline the code block - many folders carry both and
+    # the second download would be redundant.
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all([files["README"] for files in grouped.values()], shas)
+    js_needed = [
+        files["CODE"]
+        for files in grouped.values()
+        if files["CODE"] and not extract_code_from_readme(raw.get(files["README"], ""))
+    ]
+    raw.update(fetch_all(js_needed, shas))
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in ("title", "description", "code", "repo_path")}
     for folder, files in sorted(grouped.items()):
         if files["README"]:  # Only include if README exists
-            rows.append(build_row(folder, files))
+            row = build_row(folder, files, raw)
+            for key, values in cols.items():
+                values.append(row[key])
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
@@ -129,12 +99,17 @@ def main():
     ap.add_argument("--out", default="inbound_actions.xlsx", help="Output .xlsx filename")
     args = ap.parse_args()
 
+    if output_is_current("inbound_actions", args.out):
+        print(f"{args.out} is up to date; skipping scrape")
+        return
+
     df = scrape()
     df = df[[
         "title", "description", "code", "repo_path"
     ]]
 
-    df.to_excel(args.out, index=False)
+    write_xlsx(df, args.out)
+    record_head_sha("inbound_actions")
     print(f"Saved {len(df)} inbound actions to {args.out}")
 
 
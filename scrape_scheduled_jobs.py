@@ -1,49 +1,19 @@
-import os, re, time, argparse
-from dotenv import load_dotenv
-from collections import defaultdict, Counter
-from typing import Dict, List
-import requests, pandas as pd
-
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
-
-FOLDER      = "Server-Side Components/Scheduled Jobs"
-API_BASE    = "https://api.github.com"
-RAW_BASE    = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
+import re, argparse
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import pandas as pd
 
+from snippets_common import (
+    OUTPUT_EXTENSIONS,
+    fetch_all,
+    list_folder_tree,
+    output_is_current,
+    record_head_sha,
+    write_output,
+)
 
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
+FOLDER = "Server-Side Components/Scheduled Jobs"
 
 
 def group_scheduled_jobs_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
@@ -70,131 +40,144 @@ def group_scheduled_jobs_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
 
 
 # --------- Parsers for Scheduled Job metadata ---------
+# Every pattern used inside the per-folder loop is compiled once at module
+# scope; re's internal cache still re-hashes the pattern string on each call.
+
+# The spelling variants are fused into one pattern each (the optional
+# "job "/"run " prefix, and \s* absorbing "dayofweek" vs "day of week"),
+# so every field is a single scan instead of up to two.
+JOB_NAME_RE = re.compile(r"(?i)\b(?:job\s*)?name\s*[:\-]\s*(.+)")
+RUN_AS_RE = re.compile(r"(?i)\brun\s*as\s*[:\-]\s*(.+)")
+RUN_START_RE = re.compile(r"(?i)\b(?:run\s*)?start\s*[:\-]\s*(.+)")
+RUN_PERIOD_RE = re.compile(r"(?i)\brun\s*period\s*[:\-]\s*(.+)")
+RUN_DAYOFWEEK_RE = re.compile(r"(?i)\bday\s*of\s*week\s*[:\-]\s*(.+)")
+RUN_DAYOFMONTH_RE = re.compile(r"(?i)\bday\s*of\s*month\s*[:\-]\s*(.+)")
+RUN_TIME_RE = re.compile(r"(?i)\btime\s*[:\-]\s*(.+)")
+DESCRIPTION_RE = re.compile(r"(?i)\bdescription\s*[:\-]\s*(.+)")
+# First line that is not blank, a heading or a metadata key - one multiline
+# search instead of splitlines() plus per-line strip/match.
+DESC_LINE_RE = re.compile(
+    r"(?im)^(?!\s*$)(?!\s*#)"
+    r"(?!\s*(?:name|run\s*as|start|period|day|time)\s*[:\-])\s*(.+)$"
+)
+
 
 def parse_job_name(md: str) -> str:
-    patterns = [
-        r"(?i)\bjob\s*name\s*[:\-]\s*(.+)",
-        r"(?i)\bname\s*[:\-]\s*(.+)",
-    ]
-    for p in patterns:
-        m = re.search(p, md)
-        if m:
-            return m.group(1).strip()
-    return ""
+    m = JOB_NAME_RE.search(md)
+    return (m.group(1).strip() if m else "")
 
 
 def parse_run_as(md: str) -> str:
-    m = re.search(r"(?i)\brun\s*as\s*[:\-]\s*(.+)", md)
+    m = RUN_AS_RE.search(md)
     return (m.group(1).strip() if m else "")
 
 
 def parse_run_start(md: str) -> str:
-    patterns = [
-        r"(?i)\brun\s*start\s*[:\-]\s*(.+)",
-        r"(?i)\bstart\s*[:\-]\s*(.+)",
-    ]
-    for p in patterns:
-        m = re.search(p, md)
-        if m:
-            return m.group(1).strip()
-    return ""
+    m = RUN_START_RE.search(md)
+    return (m.group(1).strip() if m else "")
 
 
 def parse_run_period(md: str) -> str:
-    m = re.search(r"(?i)\brun\s*period\s*[:\-]\s*(.+)", md)
+    m = RUN_PERIOD_RE.search(md)
     return (m.group(1).strip() if m else "")
 
 
 def parse_run_dayofweek(md: str) -> str:
-    patterns = [
-        r"(?i)\bday\s*of\s*week\s*[:\-]\s*(.+)",
-        r"(?i)\bdayofweek\s*[:\-]\s*(.+)",
-    ]
-    for p in patterns:
-        m = re.search(p, md)
-        if m:
-            return m.group(1).strip()
-    return ""
+    m = RUN_DAYOFWEEK_RE.search(md)
+    return (m.group(1).strip() if m else "")
 
 
 def parse_run_dayofmonth(md: str) -> str:
-    patterns = [
-        r"(?i)\bday\s*of\s*month\s*[:\-]\s*(.+)",
-        r"(?i)\bdayofmonth\s*[:\-]\s*(.+)",
-    ]
-    for p in patterns:
-        m = re.search(p, md)
-        if m:
-            return m.group(1).strip()
-    return ""
+    m = RUN_DAYOFMONTH_RE.search(md)
+    return (m.group(1).strip() if m else "")
 
 
 def parse_run_time(md: str) -> str:
-    m = re.search(r"(?i)\btime\s*[:\-]\s*(.+)", md)
+    m = RUN_TIME_RE.search(md)
     return (m.group(1).strip() if m else "")
 
 
 def parse_description(md: str) -> str:
-    m = re.search(r"(?i)\bdescription\s*[:\-]\s*(.+)", md)
+    m = DESCRIPTION_RE.search(md)
     if m: return m.group(1).strip()
-    for line in md.splitlines():
-        t = line.strip()
-        if not t or t.startswith("#"): continue
-        if re.match(r"(?i)^(name|run as|start|period|day|time)\s*[:\-]", t):
-            continue
-        return t
-    return ""
+    m = DESC_LINE_RE.search(md)
+    return m.group(1).strip() if m else ""
+
+
+# Copied template READMEs are byte-identical across folders; caching on the
+# content itself means each distinct README pays the regex work once.
+@lru_cache(maxsize=None)
+def parse_readme_all(md: str) -> Tuple[str, str, str, str, str, str, str, str]:
+    return (
+        parse_description(md),
+        parse_job_name(md),
+        parse_run_as(md),
+        parse_run_start(md),
+        parse_run_period(md),
+        parse_run_dayofweek(md),
+        parse_run_dayofmonth(md),
+        parse_run_time(md),
+    )
 
 
 def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = list_folder_tree(FOLDER)
     grouped = group_scheduled_jobs_files(tree)
 
-    rows = []
+    # Fan the downloads out up front; the per-folder loop below then only
+    # does dict lookups instead of serial round-trips.
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all(
+        [p for files in grouped.values() for p in (files["readme"], files["js"])],
+        shas,
+    )
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in (
+        "title", "description", "code", "job_name", "run_as", "run_start",
+        "run_period", "run_dayofweek", "run_dayofmonth", "run_time", "repo_path",
+    )}
     for folder, files in sorted(grouped.items()):
-        readme_md = fetch_raw(files["readme"]) if files["readme"] else ""
-        js_code   = fetch_raw(files["js"]) if files["js"] else ""
-
-        job_name = parse_job_name(readme_md) if readme_md else ""
-        run_as = parse_run_as(readme_md) if readme_md else ""
-        run_start = parse_run_start(readme_md) if readme_md else ""
-        run_period = parse_run_period(readme_md) if readme_md else ""
-        run_dayofweek = parse_run_dayofweek(readme_md) if readme_md else ""
-        run_dayofmonth = parse_run_dayofmonth(readme_md) if readme_md else ""
-        run_time = parse_run_time(readme_md) if readme_md else ""
-        desc = parse_description(readme_md) if readme_md else ""
-
-        rows.append({
-            "title": folder,
-            "description": desc,
-            "code": js_code,
-            "job_name": job_name,
-            "run_as": run_as,
-            "run_start": run_start,
-            "run_period": run_period,
-            "run_dayofweek": run_dayofweek,
-            "run_dayofmonth": run_dayofmonth,
-            "run_time": run_time,
-            "repo_path": f"{FOLDER}/{folder}",
-        })
-
-    return pd.DataFrame(rows)
+        readme_md = raw.get(files["readme"], "") if files["readme"] else ""
+        js_code   = raw.get(files["js"], "") if files["js"] else ""
+
+        (desc, job_name, run_as, run_start, run_period,
+         run_dayofweek, run_dayofmonth, run_time) = (
+            parse_readme_all(readme_md) if readme_md else ("",) * 8
+        )
+
+        cols["title"].append(folder)
+        cols["description"].append(desc)
+        cols["code"].append(js_code)
+        cols["job_name"].append(job_name)
+        cols["run_as"].append(run_as)
+        cols["run_start"].append(run_start)
+        cols["run_period"].append(run_period)
+        cols["run_dayofweek"].append(run_dayofweek)
+        cols["run_dayofmonth"].append(run_dayofmonth)
+        cols["run_time"].append(run_time)
+        cols["repo_path"].append(f"{FOLDER}/{folder}")
+
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape Scheduled Jobs from code-snippets repo")
-    ap.add_argument("--out", default="spreadsheets/scheduled_jobs.xlsx", help="Output .xlsx filename")
+    ap.add_argument("--out", default=None, help="Output filename (default derives from --format)")
+    ap.add_argument("--format", choices=["feather", "parquet", "csv", "xlsx"], default="feather",
+                    help="Output format; feather is the fastest to write and read back")
     args = ap.parse_args()
+    out = args.out or "spreadsheets/scheduled_jobs" + OUTPUT_EXTENSIONS[args.format]
 
-    df = scrape()
-    xlsx_path = args.out
-    df.to_excel(xlsx_path, index=False)
-
-    csv_path = xlsx_path.replace(".xlsx", ".csv")
-    df.to_csv(csv_path, index=False)
+    if output_is_current("scheduled_jobs", out):
+        print(f"{out} is up to date; skipping scrape")
+        return
 
-    print(f"Saved {len(df)} scheduled jobs to {xlsx_path} and {csv_path}")
+    df = scrape()
+    write_output(df, out, args.format)
+    record_head_sha("scheduled_jobs")
+    print(f"Saved {len(df)} scheduled jobs to {out}")
 
 
 if __name__ == "__main__":
@@ -1,54 +1,23 @@
-import os
 import re
-import time
 import argparse
-from typing import Dict, List, Optional
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List
 
-import requests
 import pandas as pd
-from dotenv import load_dotenv
 
-OWNER = "ServiceNowDevProgram"
-REPO  = "code-snippets"
-API_BASE = "https://api.github.com"
+from snippets_common import (
+    fetch_all,
+    list_folder_tree,
+    output_is_current,
+    record_head_sha,
+    write_xlsx,
+)
 
-# URL-encoded GitHub API path for the Script Includes folder
-API_PATH = "Server-Side%20Components/Script%20Includes"
+FOLDER = "Server-Side Components/Script Includes"
 
-SESSION = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    SESSION.headers.update({"Authorization": f"Bearer {TOKEN}"})
 
-
-def gh_get(path: str, params: Optional[Dict] = None) -> requests.Response:
-    url = f"{API_BASE}{path}"
-    for attempt in range(3):
-        r = SESSION.get(url, params=params, timeout=30)
-        if r.status_code == 403 and "rate limit" in r.text.lower():
-            time.sleep(5 + attempt * 5)
-            continue
-        if r.ok:
-            return r
-        time.sleep(1 + attempt)
-    r.raise_for_status()
-    return r
-
-
-def list_dir(owner: str, repo: str, path: str) -> List[Dict]:
-    r = gh_get(f"/repos/{owner}/{repo}/contents/{path}")
-    data = r.json()
-    return data if isinstance(data, list) else []
-
-
-def get_raw(url: str) -> str:
-    r = SESSION.get(url, timeout=30)
-    r.raise_for_status()
-    return r.text
-
-
-def as_bool(val: Optional[str]) -> str:
+def as_bool(val) -> str:
     """Normalize truthy/falsey text to 'true'/'false'/''."""
     if not val:
         return ""
@@ -60,6 +29,31 @@ def as_bool(val: Optional[str]) -> str:
     return ""
 
 
+def group_script_include_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
+    """Return mapping: <folder> -> {'readme': path, 'js': path} under our script-includes folder."""
+    grouped = defaultdict(lambda: {"readme": "", "js": ""})
+    prefix = f"{FOLDER}/"
+    prefix_len = len(prefix)
+    paths = [
+        node.get("path", "")
+        for node in tree
+        if node.get("type") == "blob" and node.get("path", "").startswith(prefix)
+    ]
+    for path in paths:
+        rel = path[prefix_len:]
+        parts = rel.split("/")
+        if len(parts) < 2:
+            continue
+        folder = parts[0]
+        filename = "/".join(parts[1:])
+        low = filename.lower()
+        if low == "readme.md":
+            grouped[folder]["readme"] = path
+        elif low.endswith(".js") and not grouped[folder]["js"]:
+            grouped[folder]["js"] = path
+    return grouped
+
+
 # --- README parsers ---------------------------------------------------------
 
 # Lines like:
@@ -69,28 +63,37 @@ def as_bool(val: Optional[str]) -> str:
 # - Glide AJAX enabled: true/false  (aka client_callable)
 # - Mobile callable: true/false
 # - Sandbox enabled: true/false
+# Compiled once at import; parse_readme_fields runs per folder and re's
+# internal cache would still re-hash the pattern string on every call.
 README_FIELD_PATTERNS = {
-    "api_name":        r"(?i)\bapi\s*name\s*[:\-]\s*(.+)",
-    "access":          r"(?i)\baccessible\s*from\s*[:\-]\s*(.+)",
-    "active":          r"(?i)\bactive\s*[:\-]\s*([A-Za-z0-9_]+)",
-    "client_callable": r"(?i)\b(glide\s*ajax\s*enabled|client\s*callable)\s*[:\-]\s*([A-Za-z0-9_]+)",
-    "mobile_callable": r"(?i)\bmobile\s*callable\s*[:\-]\s*([A-Za-z0-9_]+)",
-    "sandbox_callable":r"(?i)\bsandbox\s*enabled\s*[:\-]\s*([A-Za-z0-9_]+)",
-    "description":     r"(?i)\bdescription\s*[:\-]\s*(.+)",
+    "api_name":        re.compile(r"(?i)\bapi\s*name\s*[:\-]\s*(.+)"),
+    "access":          re.compile(r"(?i)\baccessible\s*from\s*[:\-]\s*(.+)"),
+    "active":          re.compile(r"(?i)\bactive\s*[:\-]\s*([A-Za-z0-9_]+)"),
+    "client_callable": re.compile(r"(?i)\b(glide\s*ajax\s*enabled|client\s*callable)\s*[:\-]\s*([A-Za-z0-9_]+)"),
+    "mobile_callable": re.compile(r"(?i)\bmobile\s*callable\s*[:\-]\s*([A-Za-z0-9_]+)"),
+    "sandbox_callable":re.compile(r"(?i)\bsandbox\s*enabled\s*[:\-]\s*([A-Za-z0-9_]+)"),
+    "description":     re.compile(r"(?i)\bdescription\s*[:\-]\s*(.+)"),
 }
 
+META_LINE_RE = re.compile(
+    r"(?i)^(api\s*name|accessible\s*from|active|glide\s*ajax|client\s*callable|mobile\s*callable|sandbox\s*enabled)\s*[:\-]"
+)
+
+# Duplicate READMEs (copied templates) are parsed once; callers only read
+# from the returned dict, so sharing the cached instance is safe.
+@lru_cache(maxsize=None)
 def parse_readme_fields(md: str) -> Dict[str, str]:
     out: Dict[str, str] = {}
 
-    def grab(key: str, pat: str, group: int = 1):
-        m = re.search(pat, md)
+    def grab(key: str, pat, group: int = 1):
+        m = pat.search(md)
         if m:
             out[key] = m.group(group).strip()
 
     grab("api_name", README_FIELD_PATTERNS["api_name"])
     grab("access",   README_FIELD_PATTERNS["access"])
     grab("active",   README_FIELD_PATTERNS["active"])
-    m = re.search(README_FIELD_PATTERNS["client_callable"], md)
+    m = README_FIELD_PATTERNS["client_callable"].search(md)
     if m:
         out["client_callable"] = m.group(2).strip()
     grab("mobile_callable",  README_FIELD_PATTERNS["mobile_callable"])
@@ -104,7 +107,7 @@ def parse_readme_fields(md: str) -> Dict[str, str]:
             if not t or t.startswith("#"):
                 continue
             # skip obvious metadata lines
-            if re.match(r"(?i)^(api\s*name|accessible\s*from|active|glide\s*ajax|client\s*callable|mobile\s*callable|sandbox\s*enabled)\s*[:\-]", t):
+            if META_LINE_RE.match(t):
                 continue
             out["description"] = t
             break
@@ -117,50 +120,30 @@ def parse_readme_fields(md: str) -> Dict[str, str]:
     return out
 
 
-# --- JS parsers (fallback heuristics) ---------------------------------------
-
-def infer_access_from_code(js: str) -> str:
-    """
-    Very rough hints:
-    - If it extends AbstractAjaxProcessor, often used for GlideAjax (older pattern).
-    """
-    if re.search(r"\bAbstractAjaxProcessor\b", js):
-        return ""  # not definitive; leave blank
-    return ""
-
-
 def scrape() -> pd.DataFrame:
-    roots = list_dir(OWNER, REPO, API_PATH)
-    rows = []
-
-    for ent in sorted(roots, key=lambda x: x.get("name", "").lower()):
-        if ent.get("type") != "dir":
-            continue
-
-        sub_items = list_dir(OWNER, REPO, ent["path"])
-
-        # README.md
-        readme_item = next((i for i in sub_items
-                            if i.get("type") == "file" and i["name"].lower() == "readme.md"), None)
-        readme_md = ""
-        if readme_item and readme_item.get("download_url"):
-            try:
-                readme_md = get_raw(readme_item["download_url"])
-            except Exception:
-                readme_md = ""
-
-        # .js (script include code)
-        js_item = next((i for i in sub_items
-                        if i.get("type") == "file" and i["name"].lower().endswith(".js")), None)
-        code = ""
-        if js_item and js_item.get("download_url"):
-            try:
-                code = get_raw(js_item["download_url"])
-            except Exception:
-                code = ""
+    tree = list_folder_tree(FOLDER)
+    grouped = group_script_include_files(tree)
+
+    # Fan the downloads out up front; the per-folder loop below then only
+    # does dict lookups instead of serial round-trips.
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all(
+        [p for files in grouped.values() for p in (files["readme"], files["js"])],
+        shas,
+    )
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in (
+        "title", "api_name", "description", "access", "active",
+        "client_callable", "mobile_callable", "sandbox_callable", "script",
+    )}
+    for folder, files in sorted(grouped.items()):
+        readme_md = raw.get(files["readme"], "")
+        code = raw.get(files["js"], "")
 
         fields = {
-            "title": ent["name"],
+            "title": folder,
             "api_name": "",
             "description": "",
             "access": "",
@@ -175,13 +158,10 @@ def scrape() -> pd.DataFrame:
             md_fields = parse_readme_fields(readme_md)
             fields.update({k: md_fields.get(k, fields[k]) for k in fields.keys() if k in md_fields})
 
-        # Code-based fallbacks (light heuristics)
-        if not fields["access"] and code:
-            fields["access"] = infer_access_from_code(code)
+        for key, values in cols.items():
+            values.append(fields[key])
 
-        rows.append(fields)
-
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
@@ -189,6 +169,10 @@ def main():
     ap.add_argument("--out", default="script_includes.xlsx", help="Output .xlsx filename")
     args = ap.parse_args()
 
+    if output_is_current("script_includes", args.out):
+        print(f"{args.out} is up to date; skipping scrape")
+        return
+
     df = scrape()
     # Order columns similar to the ServiceNow form (backend names shown)
     df = df[[
@@ -202,7 +186,8 @@ def main():
         "active",
         "script"
     ]]
-    df.to_excel(args.out, index=False)
+    write_xlsx(df, args.out)
+    record_head_sha("script_includes")
     print(f"Saved {len(df)} rows to {args.out}")
 
 
@@ -1,53 +1,21 @@
-import os, re, time, argparse
+import argparse
 from collections import defaultdict
-from dotenv import load_dotenv
 from typing import Dict, List
-import requests, pandas as pd
-
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
+import pandas as pd
+
+from snippets_common import (
+    OUTPUT_EXTENSIONS,
+    extract_code_from_readme,
+    fetch_all,
+    list_folder_tree,
+    output_is_current,
+    record_head_sha,
+    write_output,
+)
 
 # Repo folder that holds all server-side components scripts
 FOLDER = "Server-Side Components"
 
-API_BASE = "https://api.github.com"
-RAW_BASE = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    """HTTP request with retries/backoff for rate limits."""
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
-
-
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
-
 
 def group_server_side_files(tree: List[Dict]) -> Dict[str, Dict[str, Dict[str, str]]]:
     """
@@ -89,24 +57,10 @@ def group_server_side_files(tree: List[Dict]) -> Dict[str, Dict[str, Dict[str, s
     return grouped
 
 
-def extract_code_from_readme(readme: str) -> str:
-    """
-    Extract JavaScript code from README.md code blocks.
-    Looks for ```javascript or ```js blocks.
-    """
-    pattern = r'```(?:javascript|js)\s*\n(.*?)\n```'
-    matches = re.findall(pattern, readme, re.DOTALL)
-    if matches:
-        return matches[0].strip()  # Return the first/main code block
-    return ""
-
-
-def build_row(type_folder: str, name: str, files: Dict[str, str]) -> Dict[str, str]:
-    readme = fetch_raw(files["README"]) if files["README"] else ""
-    code1_path = files["CODE1"]
-    code2_path = files["CODE2"]
-    code1 = fetch_raw(code1_path) if code1_path else ""
-    code2 = fetch_raw(code2_path) if code2_path else ""
+def build_row(type_folder: str, name: str, files: Dict[str, str], raw: Dict[str, str]) -> Dict[str, str]:
+    readme = raw.get(files["README"], "")
+    code1 = raw.get(files["CODE1"], "")
+    code2 = raw.get(files["CODE2"], "")
 
     # If no code files, try extracting from README
     if not code1:
@@ -125,38 +79,54 @@ def build_row(type_folder: str, name: str, files: Dict[str, str]) -> Dict[str, s
 
 
 def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
+    tree = list_folder_tree(FOLDER)
     grouped = group_server_side_files(tree)
 
-    rows = []
+    # Fan the downloads out up front; build_row then only looks up text.
+    shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+    raw = fetch_all(
+        [
+            p
+            for snippets in grouped.values()
+            for files in snippets.values()
+            for p in (files["README"], files["CODE1"], files["CODE2"])
+        ],
+        shas,
+    )
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in ("title", "description", "code", "code2", "type", "repo_path")}
     for type_folder in sorted(grouped.keys()):
         for snippet_folder, files in sorted(grouped[type_folder].items()):
             if files["README"]:  # Only include if README exists
-                rows.append(build_row(type_folder, snippet_folder, files))
+                row = build_row(type_folder, snippet_folder, files, raw)
+                for key, values in cols.items():
+                    values.append(row[key])
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape Server-Side Components from code-snippets repo")
-    ap.add_argument("--out", default="spreadsheets/server_side_components.xlsx", help="Output .xlsx filename")
+    ap.add_argument("--out", default=None, help="Output filename (default derives from --format)")
+    ap.add_argument("--format", choices=["feather", "parquet", "csv", "xlsx"], default="feather",
+                    help="Output format; feather is the fastest to write and read back")
     args = ap.parse_args()
+    out = args.out or "spreadsheets/server_side_components" + OUTPUT_EXTENSIONS[args.format]
+
+    if output_is_current("server_side_components", out):
+        print(f"{out} is up to date; skipping scrape")
+        return
 
     df = scrape()
     df = df[[
         "title", "description", "code", "code2", "type", "repo_path"
     ]]
 
-    # Save to XLSX
-    xlsx_path = args.out
-    df.to_excel(xlsx_path, index=False)
-
-    # Also save to CSV for consistency with other scripts
-    csv_path = xlsx_path.replace(".xlsx", ".csv")
-    df.to_csv(csv_path, index=False)
-
-    print(f"Saved {len(df)} server-side components to {xlsx_path} and {csv_path}")
+    write_output(df, out, args.format)
+    record_head_sha("server_side_components")
+    print(f"Saved {len(df)} server-side components to {out}")
 
 
 if __name__ == "__main__":
@@ -1,52 +1,75 @@
-import os, re, time, argparse
-from collections import defaultdict
-from dotenv import load_dotenv
+import re, argparse, tarfile
+from io import BytesIO
 from typing import Dict, List
-import requests, pandas as pd
-
-OWNER  = "ServiceNowDevProgram"
-REPO   = "code-snippets"
-BRANCH = "main"
+import pandas as pd
+
+from snippets_common import (
+    API_BASE,
+    BRANCH,
+    OUTPUT_EXTENSIONS,
+    OWNER,
+    REPO,
+    fetch_all,
+    list_folder_tree,
+    req,
+    write_output,
+)
 
 # Repo folder that holds all widgets
 FOLDER = "Modern Development/Service Portal Widgets"
 
-API_BASE = "https://api.github.com"
-RAW_BASE = "https://raw.githubusercontent.com"
-
-S = requests.Session()
-load_dotenv()
-TOKEN = os.getenv("GITHUB_TOKEN")
-if TOKEN:
-    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
-
-
-def req(method: str, url: str, **kw):
-    """HTTP request with retries/backoff for rate limits."""
-    for attempt in range(6):
-        r = S.request(method, url, timeout=30, **kw)
-        if r.status_code in (403, 429) or r.status_code >= 500:
-            time.sleep(min(2 ** attempt, 20))
-            continue
-        r.raise_for_status()
-        return r
-    r.raise_for_status()
-    return r
-
-
-def get_branch_sha() -> str:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
-    return r.json()["commit"]["sha"]
-
-
-def list_tree_recursive(sha: str) -> List[Dict]:
-    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}", params={"recursive": "1"})
-    return r.json().get("tree", [])
 
+def fetch_tarball(prefix: str) -> Dict[str, str]:
+    """Download the repo tarball once; return path -> text under `prefix`.
 
-def fetch_raw(path: str) -> str:
-    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
-    return req("GET", url).text
+    One gzip stream replaces hundreds of per-file round-trips - the
+    fastest way to populate a cold run, though it re-transfers
+    everything so the sha-cached path wins once the cache is warm.
+    """
+    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/tarball/{BRANCH}")
+    texts: Dict[str, str] = {}
+    with tarfile.open(fileobj=BytesIO(r.content), mode="r:gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            # Member names carry a "<owner>-<repo>-<sha>/" root folder.
+            path = member.name.split("/", 1)[1] if "/" in member.name else member.name
+            if not path.startswith(prefix):
+                continue
+            f = tar.extractfile(member)
+            if f is not None:
+                texts[path] = f.read().decode("utf-8", errors="replace")
+    return texts
+
+
+# Lower-cased filename -> field; one hash lookup replaces the chained
+# equality tests the old if/elif ladder ran per file.
+_FILE_TO_FIELD = {
+    "readme.md": "README",
+    "html.html": "HTML",
+    "template.html": "HTML",
+    "client.js": "CLIENT",
+    "script_client.js": "CLIENT",
+    "client_script.js": "CLIENT",
+    "server.js": "SERVER",
+    "script_server.js": "SERVER",
+    "server_script.js": "SERVER",
+    "demo_data.json": "DEMO",
+    "demodata.json": "DEMO",
+    "option_schema.json": "SCHEMA",
+    "options_schema.json": "SCHEMA",
+    "optionschema.json": "SCHEMA",
+}
+
+_EMPTY_WIDGET = {
+    "README": "",
+    "HTML": "",
+    "CLIENT": "",
+    "SERVER": "",
+    "CSS": "",
+    "DEMO": "",
+    "SCHEMA": "",
+}
 
 
 def group_widget_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
@@ -54,24 +77,18 @@ def group_widget_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
     Group widget files by top-level widget folder.
     We capture common filenames used in this repo.
     """
-    grouped = defaultdict(lambda: {
-        "README": "",
-        "HTML": "",
-        "CLIENT": "",
-        "SERVER": "",
-        "CSS": "",
-        "DEMO": "",
-        "SCHEMA": ""
-    })
+    grouped: Dict[str, Dict[str, str]] = {}
     prefix = f"{FOLDER}/"
-    for node in tree:
-        if node.get("type") != "blob":
-            continue
-        path = node.get("path", "")
-        if not path.startswith(prefix):
-            continue
-
-        rel = path[len(prefix):]  # e.g., "Drag & drop Widget/client.js"
+    prefix_len = len(prefix)
+    # Pre-filter once; the per-path loop below no longer pays two string
+    # checks for every unrelated blob in the tree.
+    paths = [
+        node.get("path", "")
+        for node in tree
+        if node.get("type") == "blob" and node.get("path", "").startswith(prefix)
+    ]
+    for path in paths:
+        rel = path[prefix_len:]  # e.g., "Drag & drop Widget/client.js"
         parts = rel.split("/")
         if len(parts) != 2:
             # We only consider files directly under each widget folder
@@ -80,25 +97,30 @@ def group_widget_files(tree: List[Dict]) -> Dict[str, Dict[str, str]]:
         folder, filename = parts
         low = filename.lower()
 
-        if low == "readme.md":
-            grouped[folder]["README"] = path
-        elif low in ("html.html", "template.html"):
-            grouped[folder]["HTML"] = path
-        elif low in ("client.js", "script_client.js", "client_script.js"):
-            grouped[folder]["CLIENT"] = path
-        elif low in ("server.js", "script_server.js", "server_script.js"):
-            grouped[folder]["SERVER"] = path
-        elif low.endswith(".css") and not grouped[folder]["CSS"]:
-            grouped[folder]["CSS"] = path  # first css file wins
-        elif low in ("demo_data.json", "demodata.json", "demoData.json"):
-            grouped[folder]["DEMO"] = path
-        elif low in ("option_schema.json", "options_schema.json", "optionschema.json"):
-            grouped[folder]["SCHEMA"] = path
+        field = _FILE_TO_FIELD.get(low)
+        if field is None:
+            if not low.endswith(".css"):
+                continue
+            field = "CSS"
+        files = grouped.setdefault(folder, _EMPTY_WIDGET.copy())
+        if field != "CSS" or not files["CSS"]:  # first css file wins
+            files[field] = path
 
     return grouped
 
 
 # ---------------- Parsers ----------------
+# Patterns are compiled once at module scope; re's internal cache still
+# re-hashes the pattern string on every call. The two controller-alias
+# spellings are fused into one alternation, so a widget without either
+# form costs a single scan instead of two.
+
+_CTRL_RE = re.compile(
+    r"controllerAs\s*:\s*['\"]([A-Za-z_][A-Za-z0-9_]*)['\"]"
+    r"|\bvar\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*this\s*;"
+)
+_LINK_RE = re.compile(r"\bfunction\s+link\s*\(([^\)]*)\)\s*\{")
+
 
 def extract_controller_as(client_js: str) -> str:
     """
@@ -106,12 +128,9 @@ def extract_controller_as(client_js: str) -> str:
       - controllerAs: 'c'
       - var c = this; (most common scaffold)
     """
-    m = re.search(r"controllerAs\s*:\s*['\"]([A-Za-z_][A-Za-z0-9_]*)['\"]", client_js)
-    if m:
-        return m.group(1)
-    m = re.search(r"\bvar\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*this\s*;", client_js)
+    m = _CTRL_RE.search(client_js)
     if m:
-        return m.group(1)
+        return m.group(1) or m.group(2)
     return ""
 
 
@@ -120,32 +139,37 @@ def extract_link_function(client_js: str) -> str:
     Extract a top-level 'function link(...) { ... }' if present.
     """
     # Simple brace-matching approach for link function
-    m = re.search(r"\bfunction\s+link\s*\(([^\)]*)\)\s*\{", client_js)
+    m = _LINK_RE.search(client_js)
     if not m:
         return ""
     start = m.end()  # index just after '{'
     depth = 1
     i = start
-    while i < len(client_js):
-        ch = client_js[i]
-        if ch == "{":
+    # Jump between brace occurrences with str.find (a C-level scan)
+    # instead of dispatching one bytecode per character of JS. Braces
+    # inside strings are miscounted either way, as before.
+    while depth:
+        close_i = client_js.find("}", i)
+        if close_i == -1:
+            return ""
+        open_i = client_js.find("{", i, close_i)
+        if open_i != -1:
             depth += 1
-        elif ch == "}":
+            i = open_i + 1
+        else:
             depth -= 1
-            if depth == 0:
-                return "function link(" + m.group(1) + "){\n" + client_js[start:i] + "\n}"
-        i += 1
-    return ""
+            i = close_i + 1
+    return "function link(" + m.group(1) + "){\n" + client_js[start:i - 1] + "\n}"
 
 
-def build_row(name: str, files: Dict[str, str]) -> Dict[str, str]:
-    readme = fetch_raw(files["README"]) if files["README"] else ""
-    html   = fetch_raw(files["HTML"]) if files["HTML"] else ""
-    client = fetch_raw(files["CLIENT"]) if files["CLIENT"] else ""
-    server = fetch_raw(files["SERVER"]) if files["SERVER"] else ""
-    css    = fetch_raw(files["CSS"]) if files["CSS"] else ""
-    demo   = fetch_raw(files["DEMO"]) if files["DEMO"] else ""
-    schema = fetch_raw(files["SCHEMA"]) if files["SCHEMA"] else ""
+def build_row(name: str, files: Dict[str, str], raw: Dict[str, str]) -> Dict[str, str]:
+    readme = raw.get(files["README"], "")
+    html   = raw.get(files["HTML"], "")
+    client = raw.get(files["CLIENT"], "")
+    server = raw.get(files["SERVER"], "")
+    css    = raw.get(files["CSS"], "")
+    demo   = raw.get(files["DEMO"], "")
+    schema = raw.get(files["SCHEMA"], "")
 
     controller_as = extract_controller_as(client) if client else ""
     link_func     = extract_link_function(client) if client else ""
@@ -168,31 +192,57 @@ def build_row(name: str, files: Dict[str, str]) -> Dict[str, str]:
 
 
 
-def scrape() -> pd.DataFrame:
-    sha = get_branch_sha()
-    tree = list_tree_recursive(sha)
-    grouped = group_widget_files(tree)
-
-    rows = []
+def scrape(use_tarball: bool = False) -> pd.DataFrame:
+    if use_tarball:
+        # Everything arrives in one archive; no tree listing or per-file
+        # fetches needed.
+        raw = fetch_tarball(f"{FOLDER}/")
+        grouped = group_widget_files([{"type": "blob", "path": p} for p in raw])
+    else:
+        tree = list_folder_tree(FOLDER)
+        grouped = group_widget_files(tree)
+
+        # Fan the downloads out up front; build_row then only looks up text.
+        # Passing the blob shas keys the download into the on-disk cache, so
+        # unchanged widgets cost no HTTP at all on later runs.
+        shas = {n.get("path", ""): n.get("sha", "") for n in tree}
+        raw = fetch_all(
+            [p for files in grouped.values() for p in files.values() if p],
+            shas,
+        )
+
+    # Column-oriented accumulation; pandas consumes the dict of lists
+    # directly instead of transposing a list of row dicts.
+    cols: Dict[str, List[str]] = {k: [] for k in (
+        "title", "description", "html", "css", "server_script", "client_script",
+        "controller_as", "link", "demo_data", "option_schema", "repo_path",
+    )}
     for folder, files in sorted(grouped.items()):
-        rows.append(build_row(folder, files))
+        row = build_row(folder, files, raw)
+        for key, values in cols.items():
+            values.append(row[key])
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols, columns=list(cols))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Scrape Service Portal Widgets from code-snippets repo")
-    ap.add_argument("--out", default="sp_widgets.xlsx", help="Output .xlsx filename")
+    ap.add_argument("--out", default=None, help="Output filename (default derives from --format)")
+    ap.add_argument("--format", choices=["feather", "parquet", "csv", "xlsx"], default="feather",
+                    help="Output format; feather is the fastest to write and read back")
+    ap.add_argument("--tarball", action="store_true",
+                    help="Download one repo tarball instead of per-file fetches (fastest on a cold cache)")
     args = ap.parse_args()
+    out = args.out or "sp_widgets" + OUTPUT_EXTENSIONS[args.format]
 
-    df = scrape()
+    df = scrape(use_tarball=args.tarball)
     df = df[[
     "title", "description", "html", "css", "server_script", "client_script",
     "controller_as", "link", "demo_data", "option_schema", "repo_path"
     ]]
 
-    df.to_excel(args.out, index=False)
-    print(f"Saved {len(df)} widgets to {args.out}")
+    write_output(df, out, args.format)
+    print(f"Saved {len(df)} widgets to {out}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,455 @@
+"""Shared scaffolding for the ServiceNow code-snippets scrapers.
+
+The session setup, GitHub tree walking, batched blob fetching (with the
+sha-keyed on-disk cache), JS role classification and output writing all
+live here, so each scraper is reduced to its folder constant, its README
+parsers and its row assembly.
+"""
+import json, os, re, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+import requests, pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from requests.adapters import HTTPAdapter
+
+try:  # optional: 2-5x faster parsing of the multi-MB tree responses
+    import orjson
+except ImportError:
+    orjson = None
+
+OWNER  = "ServiceNowDevProgram"
+REPO   = "code-snippets"
+BRANCH = "main"
+
+API_BASE = "https://api.github.com"
+RAW_BASE = "https://raw.githubusercontent.com"
+
+S = requests.Session()
+# One keep-alive pool shared by all workers: TLS handshakes happen once per
+# connection instead of once per request. req() keeps owning retries.
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+S.mount("https://", _ADAPTER)
+S.headers["Accept-Encoding"] = "gzip"
+load_dotenv()
+TOKEN = os.getenv("GITHUB_TOKEN")
+if TOKEN:
+    S.headers.update({"Authorization": f"Bearer {TOKEN}"})
+
+
+def req(method: str, url: str, **kw):
+    """HTTP request with retries/backoff for rate limits."""
+    for attempt in range(6):
+        r = S.request(method, url, timeout=30, **kw)
+        if r.status_code in (403, 429) or r.status_code >= 500:
+            delay = 0
+            if r.status_code in (403, 429):
+                # GitHub says exactly how long to wait; exponential backoff
+                # only covers responses without either header.
+                delay = int(r.headers.get("Retry-After", 0)) or max(
+                    0, int(r.headers.get("X-RateLimit-Reset", 0)) - int(time.time())
+                )
+            time.sleep(delay or min(2 ** attempt, 20))
+            continue
+        r.raise_for_status()
+        return r
+    r.raise_for_status()
+    return r
+
+
+def _parse_json(r):
+    """Decode an API response body; orjson parses the raw bytes directly."""
+    return orjson.loads(r.content) if orjson else r.json()
+
+
+# Cached so the up-to-date check and the post-run record share one request.
+@lru_cache(maxsize=1)
+def get_branch_sha() -> str:
+    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/branches/{BRANCH}")
+    return _parse_json(r)["commit"]["sha"]
+
+
+def output_is_current(module: str, out: str) -> bool:
+    """True when `out` exists and the branch head still matches the sha
+    recorded by the last successful run - i.e. a re-run would only
+    reproduce the same file."""
+    try:
+        with open(f".lastsha_{module}") as f:
+            last = f.read().strip()
+    except OSError:
+        return False
+    return bool(last) and os.path.exists(out) and last == get_branch_sha()
+
+
+def record_head_sha(module: str) -> None:
+    with open(f".lastsha_{module}", "w") as f:
+        f.write(get_branch_sha())
+
+
+def list_tree_recursive(ref: str = BRANCH) -> List[Dict]:
+    # The tree endpoint resolves branch names directly, so callers don't
+    # need the extra get_branch_sha round-trip first.
+    r = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{ref}", params={"recursive": "1"})
+    return _parse_json(r).get("tree", [])
+
+
+def list_folder_tree(folder: str) -> List[Dict]:
+    """Return blob entries under `folder` with repo-relative paths.
+
+    Walks one tree level at a time down to the folder's own sha, then asks
+    for just that subtree recursively - typically far fewer entries than
+    the recursive root listing. Falls back to the full tree on any miss.
+    """
+    try:
+        sha = BRANCH
+        for segment in folder.split("/"):
+            level = req("GET", f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}")
+            match = next(
+                (n for n in _parse_json(level).get("tree", []) if n.get("path") == segment),
+                None,
+            )
+            if match is None:
+                raise KeyError(segment)
+            sha = match["sha"]
+        # Tree shas are immutable, so a cached listing never goes stale;
+        # only the cheap level walk above repeats when the folder is
+        # unchanged.
+        with _CACHE_LOCK:
+            row = _blob_cache().execute(
+                "SELECT body FROM trees WHERE sha = ?", (sha,)
+            ).fetchone()
+        if row is not None:
+            subtree = json.loads(row[0])
+        else:
+            subtree = _parse_json(req(
+                "GET",
+                f"{API_BASE}/repos/{OWNER}/{REPO}/git/trees/{sha}",
+                params={"recursive": "1"},
+            )).get("tree", [])
+            with _CACHE_LOCK:
+                conn = _blob_cache()
+                conn.execute(
+                    "INSERT OR REPLACE INTO trees (sha, body) VALUES (?, ?)",
+                    (sha, json.dumps(subtree)),
+                )
+                conn.commit()
+    except (KeyError, requests.RequestException):
+        return list_tree_recursive()
+    prefix = f"{folder}/"
+    return [dict(node, path=prefix + node.get("path", "")) for node in subtree]
+
+
+def fetch_raw(path: str) -> str:
+    """Fetch one raw file, revalidating against the on-disk ETag cache.
+
+    raw.githubusercontent.com serves strong ETags, so unchanged files come
+    back as body-less 304s and are served from the local copy. Blobs whose
+    git sha is known skip this entirely via the sha-keyed cache in
+    fetch_all; the ETag path covers direct and sha-less fetches.
+    """
+    url = f"{RAW_BASE}/{OWNER}/{REPO}/{BRANCH}/{path}"
+    with _CACHE_LOCK:
+        row = _blob_cache().execute(
+            "SELECT etag, body FROM etags WHERE url = ?", (url,)
+        ).fetchone()
+    headers = {"If-None-Match": row[0]} if row else None
+    r = req("GET", url, headers=headers)
+    if r.status_code == 304 and row is not None:
+        return row[1]
+    # Decode straight from the bytes; r.text would consult charset detection
+    # whenever the response omits a charset, and these files are all UTF-8.
+    text = r.content.decode("utf-8", errors="replace")
+    etag = r.headers.get("ETag")
+    if etag:
+        with _CACHE_LOCK:
+            conn = _blob_cache()
+            conn.execute(
+                "INSERT OR REPLACE INTO etags (url, etag, body) VALUES (?, ?, ?)",
+                (url, etag, text),
+            )
+            conn.commit()
+    return text
+
+
+FETCH_WORKERS = 16
+
+GRAPHQL_URL = f"{API_BASE}/graphql"
+GRAPHQL_CHUNK = 50
+
+
+def fetch_blobs_batch(paths: List[str]) -> Dict[str, str]:
+    """Fetch many blob texts per GraphQL request (requires GITHUB_TOKEN)."""
+    texts: Dict[str, str] = {}
+    for start in range(0, len(paths), GRAPHQL_CHUNK):
+        chunk = paths[start:start + GRAPHQL_CHUNK]
+        fields = "\n".join(
+            f'b{i}: object(expression: "{BRANCH}:{p}") {{ ... on Blob {{ text }} }}'
+            for i, p in enumerate(chunk)
+        )
+        query = f'query {{ repository(owner: "{OWNER}", name: "{REPO}") {{ {fields} }} }}'
+        data = _parse_json(req("POST", GRAPHQL_URL, json={"query": query}))
+        repo = (data.get("data") or {}).get("repository") or {}
+        for i, path in enumerate(chunk):
+            text = (repo.get(f"b{i}") or {}).get("text")
+            if text is not None:
+                texts[path] = text
+    return texts
+
+
+# Blob texts are content-addressed by their git sha, so an on-disk cache
+# can never go stale; warm reruns skip the network for unchanged files.
+_CACHE_DB = os.path.join(os.path.expanduser("~"), ".cache", "chatwebscraper-blobs.db")
+_CACHE_CONN = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _blob_cache() -> sqlite3.Connection:
+    global _CACHE_CONN
+    if _CACHE_CONN is None:
+        os.makedirs(os.path.dirname(_CACHE_DB), exist_ok=True)
+        conn = sqlite3.connect(_CACHE_DB, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS blobs (sha TEXT PRIMARY KEY, body TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS etags (url TEXT PRIMARY KEY, etag TEXT, body TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS trees (sha TEXT PRIMARY KEY, body TEXT)")
+        _CACHE_CONN = conn
+    return _CACHE_CONN
+
+
+def fetch_all(paths: List[str], shas: Dict[str, str] = None) -> Dict[str, str]:
+    """Fetch many paths at once; returns path -> text.
+
+    Paths whose blob sha is already cached on disk are served locally.
+    With a token, the rest come batched over GraphQL (~50 per request);
+    anything the batch misses falls back to threaded raw fetches.
+    """
+    pending = [p for p in dict.fromkeys(paths) if p]
+    if not pending:
+        return {}
+    shas = shas or {}
+    texts: Dict[str, str] = {}
+    if shas:
+        with _CACHE_LOCK:
+            conn = _blob_cache()
+            for path in pending:
+                sha = shas.get(path)
+                if not sha:
+                    continue
+                row = conn.execute("SELECT body FROM blobs WHERE sha = ?", (sha,)).fetchone()
+                if row is not None:
+                    texts[path] = row[0]
+        pending = [p for p in pending if p not in texts]
+    # Distinct folders sometimes carry byte-identical blobs (copied
+    # template READMEs, empty CSS files); fetch each distinct sha once
+    # and fan the text back out to every path that shares it.
+    dup_of: Dict[str, str] = {}
+    if shas:
+        first_for_sha: Dict[str, str] = {}
+        unique: List[str] = []
+        for path in pending:
+            sha = shas.get(path)
+            if sha in first_for_sha:
+                dup_of[path] = first_for_sha[sha]
+                continue
+            if sha:
+                first_for_sha[sha] = path
+            unique.append(path)
+        pending = unique
+    fetched: Dict[str, str] = {}
+    if TOKEN and pending:
+        try:
+            fetched = fetch_blobs_batch(pending)
+        except requests.RequestException:
+            fetched = {}
+        pending = [p for p in pending if p not in fetched]
+    if pending:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            fetched.update(zip(pending, pool.map(fetch_raw, pending)))
+    if shas and fetched:
+        rows = [(shas[p], text) for p, text in fetched.items() if shas.get(p)]
+        if rows:
+            with _CACHE_LOCK:
+                conn = _blob_cache()
+                conn.executemany("INSERT OR REPLACE INTO blobs (sha, body) VALUES (?, ?)", rows)
+                conn.commit()
+    texts.update(fetched)
+    for path, primary in dup_of.items():
+        if primary in texts:
+            texts[path] = texts[primary]
+    return texts
+
+
+# -------- Script categorization helpers --------
+
+CLIENT_NAME_HINTS = (
+    "client",
+    "onload",
+    "onchange",
+    "onsubmit",
+    "oncelledit",
+    "onvaluechange",
+    "catalog",
+    "portal",
+    "script",
+    "mrvs",
+)
+
+INCLUDE_NAME_HINTS = (
+    "include",
+    "ajax",
+    "util",
+    "utils",
+    "provider",
+    "server",
+    "processor",
+)
+
+# Filenames are tokenised once and intersected against frozensets, so a
+# hint lookup is O(1) instead of a substring scan per hint.
+_CLIENT_NAME_SET = frozenset(CLIENT_NAME_HINTS)
+_INCLUDE_NAME_SET = frozenset(INCLUDE_NAME_HINTS)
+_NAME_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CLIENT_CODE_RE = re.compile(
+    r"g_form|g_scratchpad|function\s+on(?:load|change|submit|celledit|valuechange)"
+)
+_INCLUDE_CODE_RE = re.compile(r"class\.create|prototype\s*=|\bgs\.|gliderecord")
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+
+
+# readme_mentions re-normalises the same README lines for every JS file and
+# keyword; memoising makes repeat calls a dict hit.
+@lru_cache(maxsize=4096)
+def _normalize_token(value: str) -> str:
+    return _NON_ALNUM_RE.sub("", value.lower())
+
+
+def readme_mentions(token: str, lower_lines: List[str], norm_lines: List[str], needle: str) -> bool:
+    """Return True if the README references token alongside needle.
+
+    Takes pre-lowercased lines and their normalised forms so callers pay
+    the per-line string work once per folder, not once per (file, keyword).
+    """
+    if not token:
+        return False
+    for low, norm in zip(lower_lines, norm_lines):
+        if needle in low and token in norm:
+            return True
+    return False
+
+
+def infer_js_role(filename: str, code: str, lower_lines: List[str], norm_lines: List[str]) -> str:
+    """Best-effort classification of JS files into client vs. script include."""
+    name = filename.lower()
+    content = code.lower()
+
+    token = _normalize_token(os.path.splitext(filename)[0])
+    if readme_mentions(token, lower_lines, norm_lines, "script include") or readme_mentions(token, lower_lines, norm_lines, "server script"):
+        return "script_include"
+    if readme_mentions(token, lower_lines, norm_lines, "client script"):
+        return "client"
+
+    name_tokens = set(_NAME_TOKEN_RE.findall(name))
+    if name_tokens & _INCLUDE_NAME_SET and "g_form" not in content:
+        return "script_include"
+
+    if name_tokens & _CLIENT_NAME_SET:
+        return "client"
+
+    if _CLIENT_CODE_RE.search(content):
+        return "client"
+
+    if _INCLUDE_CODE_RE.search(content):
+        # g_form content would already have classified the file as client.
+        return "script_include"
+
+    return "unknown"
+
+
+def split_js_files(entries: List[Tuple[str, str]], readme_lines: List[str]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Split list of (filename, code) pairs into client scripts and script includes."""
+    clients: List[Tuple[str, str]] = []
+    includes: List[Tuple[str, str]] = []
+    unknown: List[Tuple[str, str]] = []
+
+    # Normalise the README once per folder; every JS file and keyword then
+    # reuses the same lowercased/stripped lines.
+    lower_lines = [line.lower() for line in readme_lines]
+    norm_lines = [_normalize_token(line) for line in readme_lines]
+
+    for filename, code in entries:
+        role = infer_js_role(filename, code, lower_lines, norm_lines)
+        if role == "client":
+            clients.append((filename, code))
+        elif role == "script_include":
+            includes.append((filename, code))
+        else:
+            unknown.append((filename, code))
+
+    if not clients and unknown:
+        clients.append(unknown.pop(0))
+    includes.extend(unknown)
+
+    return clients, includes
+
+
+def combine_scripts(entries: List[Tuple[str, str]]) -> str:
+    """Combine multiple script files into a single string (joined by blank lines)."""
+    if not entries:
+        return ""
+    parts = []
+    for filename, code in sorted(entries, key=lambda item: item[0].lower()):
+        stripped = code.strip()
+        if not stripped:
+            continue
+        parts.append(stripped)
+    return "\n\n".join(parts)
+
+
+_CODEBLOCK_RE = re.compile(r"```(?:javascript|js)\s*\n(.*?)\n```", re.DOTALL)
+
+
+def extract_code_from_readme(readme: str) -> str:
+    """
+    Extract JavaScript code from README.md code blocks.
+    Looks for ```javascript or ```js blocks.
+    """
+    # search() stops at the first block; findall kept scanning the rest.
+    m = _CODEBLOCK_RE.search(readme)
+    return m.group(1).strip() if m else ""
+
+
+# -------- Output --------
+
+OUTPUT_EXTENSIONS = {"xlsx": ".xlsx", "feather": ".feather", "parquet": ".parquet", "csv": ".csv"}
+
+
+def write_output(df: pd.DataFrame, out: str, fmt: str) -> None:
+    """Write the frame in the requested format; xlsx stays as a fallback."""
+    if fmt == "feather":
+        # Going through Arrow directly skips the pandas to_feather shim and
+        # keeps the column handoff zero-copy.
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, out, compression="zstd")
+    elif fmt == "parquet":
+        df.to_parquet(out, compression="zstd")
+    elif fmt == "csv":
+        df.to_csv(out, index=False)
+    else:
+        write_xlsx(df, out)
+
+
+def write_xlsx(df: pd.DataFrame, out: str) -> None:
+    """Stream the frame to xlsx row by row.
+
+    xlsxwriter's constant_memory mode flushes each row instead of holding
+    the whole workbook in memory like the openpyxl default; strings_to_urls
+    is off so long code cells aren't scanned for hyperlinks.
+    """
+    with pd.ExcelWriter(
+        out,
+        engine="xlsxwriter",
+        engine_kwargs={"options": {"constant_memory": True, "strings_to_urls": False}},
+    ) as writer:
+        df.to_excel(writer, index=False)